@@ -1,3 +1,4 @@
+from datetime import timedelta
 import json
 import os
 
@@ -27,6 +28,8 @@ class MockRequest:
 class MockResponse:
     def __init__(self, ok=True, content=None, request=None):
         self.ok = ok
+        self.status_code = 200 if ok else 500
+        self.elapsed = timedelta(milliseconds=1)
         self.request = MockRequest(**(request or SIMPLE_REQUEST))
         self._content = content or json.dumps(RESPONSE_JSON)
 
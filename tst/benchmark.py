@@ -0,0 +1,196 @@
+'''Micro-benchmarks for yaml_requests.
+
+Run all benchmarks with `python3 tst/benchmark.py` or selected benchmarks by
+passing their names as arguments.
+'''
+from datetime import timedelta
+import json
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest.mock import patch
+
+from requests import Response
+import yaml
+
+from yaml_requests.logger import ConsoleLogger, RequestLogger
+from yaml_requests.utils.args import load_plan_files
+from yaml_requests._plan import Plan, build_plans
+from yaml_requests._runner import PlansRunner
+from yaml_requests._transport import CassettePlayer, CassetteRecorder
+from yaml_requests.utils.template import Environment, TemplateCache
+
+from _utils import RESPONSE_JSON, get_sent_mock_request
+
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+
+def measure(fn, *args):
+    start = perf_counter()
+    fn(*args)
+    return perf_counter() - start
+
+
+def print_rows(title, rows):
+    print(title)
+    key_width = max(len(i[0]) for i in rows) + 1
+    for key, value in rows:
+        print(f'  {(key + ":").ljust(key_width)} {value}')
+    print()
+
+
+@benchmark
+def logger(n=5000):
+    '''Time used for logging finished requests with different loggers.'''
+    requests = [get_sent_mock_request() for _ in range(n)]
+
+    def _log(logger):
+        logger.start()
+        logger.title('Benchmark', n)
+        for request in requests:
+            logger.start_request(request)
+            logger.finish_request(request)
+        logger.close()
+
+    with open(os.devnull, 'w') as devnull:
+        loggers = [
+            ('RequestLogger', RequestLogger()),
+            ('ConsoleLogger', ConsoleLogger(False, False, devnull)),
+            ('ConsoleLogger (buffered)', ConsoleLogger(
+                False, False, devnull, buffered=True)),
+            ('ConsoleLogger (quiet)', ConsoleLogger(
+                False, False, devnull, quiet=True)),
+        ]
+
+        rows = []
+        for name, logger in loggers:
+            elapsed = measure(_log, logger)
+            rows.append((name, f'{elapsed * 1e6 / n:.1f} µs/request'))
+
+    print_rows(f'Logging {n} requests', rows)
+
+
+def _write_startup_plans(directory, n_plans, n_variables):
+    variables = {f'variable_{i}': dict(value=i, items=list(range(5)))
+                 for i in range(n_variables)}
+    with open(os.path.join(directory, 'variables.yml'), 'w') as f:
+        yaml.dump(variables, f)
+
+    plans_dir = os.path.join(directory, 'plans')
+    os.mkdir(plans_dir)
+    for i in range(n_plans):
+        plan = dict(
+            name=f'Plan {i}',
+            variable_files=['../variables.yml'],
+            requests=[dict(
+                get=dict(url='{{ base_url }}/%d' % i),
+                assertions=[
+                    f'response.json().items[{j}].id == {i * 100 + j}'
+                    for j in range(20)
+                ],
+            )],
+        )
+        with open(os.path.join(plans_dir, f'plan_{i}.yml'), 'w') as f:
+            yaml.dump(plan, f)
+
+    return plans_dir
+
+
+@benchmark
+def startup(n_plans=50, n_variables=5000):
+    '''Time used for loading and building plans.'''
+
+    def _startup(plans_dir):
+        plan_dicts = load_plan_files(plans_dir)
+        build_plans(plan_dicts, plans_dir, {})
+
+    def _compile(plans, cache_dir):
+        env = Environment(template_cache=TemplateCache(cache_dir))
+        for plan in plans:
+            for request in plan.requests:
+                env.from_string(request['get']['url'])
+                for assertion in request['assertions']:
+                    env.compile_expression(assertion)
+
+    with TemporaryDirectory() as tmp:
+        plans_dir = _write_startup_plans(tmp, n_plans, n_variables)
+
+        rows = [('Default', f'{measure(_startup, plans_dir):.3f} s')]
+        with patch('yaml_requests.utils.args.YAML_LOADER', yaml.SafeLoader):
+            rows.append((
+                'Pure Python YAML loader',
+                f'{measure(_startup, plans_dir):.3f} s'))
+
+        plans, _ = build_plans(load_plan_files(plans_dir), plans_dir, {})
+        cache_dir = os.path.join(tmp, 'template-cache')
+        for name, directory in [
+            ('Compile templates', None),
+            ('Compile templates (cold disk cache)', cache_dir),
+            ('Compile templates (warm disk cache)', cache_dir),
+        ]:
+            rows.append((
+                name, f'{measure(_compile, plans, directory):.3f} s'))
+
+    print_rows(
+        f'Loading {n_plans} plans with {n_variables} shared variables', rows)
+
+
+@benchmark
+def replay(n=2000):
+    '''Time used for executing a plan with responses replayed from a
+    recording.'''
+    plan = Plan._from_dict(dict(
+        name='Replay',
+        requests=[dict(
+            get=dict(url=f'http://localhost:5000/{i}'),
+            assertions=['response.ok', 'response.json().message'],
+        ) for i in range(n)],
+    ))
+
+    def _request(method, url, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response.elapsed = timedelta(milliseconds=1)
+        response.headers['Content-Type'] = 'application/json'
+        response._content = json.dumps(RESPONSE_JSON).encode('utf-8')
+        return response
+
+    def _run(logger, player):
+        PlansRunner([plan], logger, replay=player).run()
+
+    with TemporaryDirectory() as tmp:
+        with patch('yaml_requests._transport.request', new=_request):
+            PlansRunner(
+                [plan], RequestLogger(),
+                record=CassetteRecorder(tmp)).run()
+
+        with open(os.devnull, 'w') as devnull:
+            loggers = [
+                ('RequestLogger', RequestLogger()),
+                ('ConsoleLogger (buffered)', ConsoleLogger(
+                    False, False, devnull, buffered=True)),
+            ]
+
+            rows = []
+            for name, logger in loggers:
+                elapsed = measure(_run, logger, CassettePlayer(tmp))
+                rows.append((name, f'{elapsed * 1e6 / n:.1f} µs/request'))
+
+    print_rows(f'Replaying {n} requests', rows)
+
+
+def main(names):
+    for name in (names or BENCHMARKS):
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
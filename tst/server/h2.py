@@ -0,0 +1,101 @@
+'''Minimal HTTP/2 server for testing HTTP/2 transport.
+
+The server speaks HTTP/2 without TLS (prior knowledge) and responds to every
+request with a JSON document describing the request.
+'''
+import json
+import socket
+from threading import Thread
+
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import DataReceived, RequestReceived, StreamEnded
+from h2.exceptions import ProtocolError
+
+
+class H2Server:
+    def __init__(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen()
+
+        self.connections = 0
+        self.streams = []
+
+    @property
+    def url(self):
+        host, port = self._socket.getsockname()
+        return f'http://{host}:{port}'
+
+    def start(self):
+        Thread(target=self._accept, daemon=True).start()
+
+    def stop(self):
+        self._socket.close()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+
+            self.connections += 1
+            Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def _respond(self, conn, stream_id, request):
+        headers = dict(request['headers'])
+        body = json.dumps(dict(
+            method=headers.get(':method'),
+            path=headers.get(':path'),
+            headers={k: v for k, v in headers.items() if ':' not in k},
+            body=request['body'].decode('utf-8'),
+            stream_id=stream_id,
+        )).encode('utf-8')
+
+        conn.send_headers(stream_id, [
+            (':status', '200'),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(body))),
+            ('etag', '"h2"'),
+        ])
+        conn.send_data(stream_id, body, end_stream=True)
+
+    def _handle(self, client):
+        conn = H2Connection(H2Configuration(
+            client_side=False, header_encoding='utf-8'))
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+
+        requests = {}
+        while True:
+            try:
+                data = client.recv(65535)
+            except OSError:
+                break
+            if not data:
+                break
+
+            try:
+                events = conn.receive_data(data)
+            except ProtocolError:
+                # E.g. HTTP/1.1 requests
+                break
+
+            for event in events:
+                if isinstance(event, RequestReceived):
+                    requests[event.stream_id] = dict(
+                        headers=event.headers, body=b'')
+                elif isinstance(event, DataReceived):
+                    requests[event.stream_id]['body'] += event.data
+                    conn.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, StreamEnded):
+                    self.streams.append(event.stream_id)
+                    self._respond(
+                        conn, event.stream_id, requests.pop(event.stream_id))
+
+            client.sendall(conn.data_to_send())
+
+        client.close()
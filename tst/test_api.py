@@ -0,0 +1,119 @@
+import asyncio
+from time import sleep
+from unittest import TestCase
+from unittest.mock import patch
+
+from yaml_requests import (
+    PlanResult,
+    iter_results,
+    run_plans,
+    run_plans_async,
+)
+from yaml_requests.error import InvalidPlanError
+
+from test_runner import get_plan, mock_request
+
+
+class MockTransport:
+    def __init__(self, delay=None):
+        self.urls = []
+        self._delay = delay
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        if self._delay and f'/{self._delay}/' in url:
+            sleep(0.2)
+        return mock_request(method, url, **kwargs)
+
+
+def plan_dict(name, n_requests=1):
+    return dict(
+        name=name,
+        requests=[
+            dict(get=dict(url=f'http://localhost:5000/{{{{ prefix }}}}/{i}'))
+            for i in range(n_requests)
+        ],
+    )
+
+
+class RunPlansTest(TestCase):
+    def test_run_plans(self):
+        transport = MockTransport()
+
+        results = run_plans(
+            [plan_dict('a', 2), get_plan('fail')],
+            variables=dict(prefix='a'),
+            transport=transport)
+
+        self.assertEqual(
+            [(i.plan.name, i.state, i.ok) for i in results],
+            [('a', 'passed', True), ('fail', 'failed', False)])
+        self.assertIsInstance(results[0], PlanResult)
+        self.assertEqual(
+            [i.status_code for i in results[0].requests], [200, 200])
+        self.assertEqual(results[1].requests[0].state, 'FAILURE')
+        self.assertEqual(transport.urls, [
+            'http://localhost:5000/a/0',
+            'http://localhost:5000/a/1',
+            'http://localhost:5000/fail/0',
+        ])
+
+    def test_same_plan_twice(self):
+        plan = get_plan('a')
+
+        results = run_plans(
+            [plan, plan], parallel=2, transport=MockTransport())
+
+        self.assertEqual([i.plan for i in results], [plan, plan])
+        self.assertEqual([len(i.requests) for i in results], [1, 1])
+
+    def test_does_not_print(self):
+        with patch('sys.stdout') as stdout:
+            run_plans(
+                [get_plan('a'), get_plan('b')],
+                parallel=2,
+                transport=MockTransport())
+
+        stdout.write.assert_not_called()
+
+    def test_invalid_plan(self):
+        with self.assertRaises(InvalidPlanError):
+            run_plans([dict(name='invalid')])
+
+    def test_run_plans_async(self):
+        results = asyncio.run(run_plans_async(
+            [get_plan('a'), get_plan('b')],
+            parallel=2,
+            transport=MockTransport()))
+
+        self.assertEqual(
+            sorted(i.plan.name for i in results), ['a', 'b'])
+
+    def test_iter_results(self):
+        transport = MockTransport(delay='b')
+        plans = [get_plan(name) for name in 'abc']
+
+        # Plan b is running when the iterator is closed, so plan c is
+        # skipped.
+        for result in iter_results(plans, transport=transport):
+            self.assertEqual(result.plan.name, 'a')
+            break
+
+        self.assertEqual(transport.urls, [
+            'http://localhost:5000/a/0',
+            'http://localhost:5000/b/0',
+        ])
+
+        transport = MockTransport()
+        self.assertEqual(
+            [i.plan.name for i in iter_results(plans, transport=transport)],
+            ['a', 'b', 'c'])
+
+    def test_fail_fast(self):
+        results = run_plans(
+            [get_plan('fail'), get_plan('a')],
+            fail_fast=True,
+            transport=MockTransport())
+
+        self.assertEqual(
+            [i.state for i in results], ['failed', 'skipped'])
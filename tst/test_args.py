@@ -1,7 +1,10 @@
 import os
 from unittest import TestCase
+from unittest.mock import patch
 
-from yaml_requests.utils.args import get_argparser, parse_variables
+from yaml_requests.utils.args import get_argparser, load_plan_files, parse_variables
+
+from _utils import plan_path
 
 
 class ArgsTest(TestCase):
@@ -20,3 +23,26 @@ class ArgsTest(TestCase):
     def test_invalid_variable(self):
         with self.assertRaises(ValueError):
             parse_variables(['no_separator'])
+
+    def test_load_plan_files(self):
+        paths = [plan_path('integration'), plan_path('minimal_plan.yml')]
+        expected = load_plan_files(paths)
+        self.assertEqual(
+            [os.path.basename(i['path']) for i in expected],
+            [
+                'build_queue.yml',
+                'loop.yml',
+                'loop_vars.yml',
+                'repeat_while.yml',
+                'use_session_defaults.yml',
+                'minimal_plan.yml',
+            ])
+
+        with patch('yaml_requests.utils.args.PARALLEL_LOAD_MIN_BYTES', 0):
+            self.assertEqual(load_plan_files(paths), expected)
+
+    def test_load_plan_files_not_found(self):
+        with patch('yaml_requests.utils.args.PARALLEL_LOAD_MIN_BYTES', 0):
+            with self.assertRaises(FileNotFoundError):
+                load_plan_files(
+                    [plan_path('minimal_plan.yml'), 'file_not_found.yml'])
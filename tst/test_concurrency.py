@@ -0,0 +1,92 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from yaml_requests._runner import PlansRunner
+from yaml_requests.utils.concurrency import AdaptiveLimit
+
+from _utils import MockResponse
+from test_runner import SummaryLogger, get_plan
+
+
+def response(elapsed=0.01, status_code=200):
+    return SimpleNamespace(
+        status_code=status_code, elapsed=timedelta(seconds=elapsed))
+
+
+class AdaptiveLimitTest(TestCase):
+    def record(self, limit, n, *args):
+        for _ in range(n):
+            limit.record(response(*args) if args else None)
+
+    def test_increase_while_latency_is_stable(self):
+        changes = []
+        limit = AdaptiveLimit(3, window=5, on_change=changes.append)
+
+        self.record(limit, 20, 0.01)
+
+        self.assertEqual(limit.limit, 3)
+        self.assertEqual(changes, [2, 3])
+        self.assertEqual(limit.summary(), '3 (min 1, max 3)')
+
+    def test_decrease_on_rising_latency(self):
+        limit = AdaptiveLimit(10, initial=8, window=5)
+
+        self.record(limit, 5, 0.01)
+        self.assertEqual(limit.limit, 9)
+        self.record(limit, 5, 0.1)
+        self.assertEqual(limit.limit, 4)
+
+    def test_recover_after_latency_shift(self):
+        changes = []
+        limit = AdaptiveLimit(
+            8, initial=6, window=5, on_change=changes.append)
+
+        self.record(limit, 5, 0.01)
+        self.record(limit, 5, 0.05)
+        self.assertEqual(limit.limit, 3)
+
+        # Responses of requests started with the previous limit are ignored
+        # and the new response times become the baseline.
+        self.record(limit, 7, 0.05)
+        self.assertEqual(limit.limit, 3)
+        self.record(limit, 100, 0.05)
+
+        self.assertEqual(changes, [7, 3, 4, 5, 6, 7, 8])
+
+    def test_decrease_on_overload(self):
+        limit = AdaptiveLimit(10, initial=8, window=5)
+
+        self.record(limit, 1, 0.01, 429)
+        self.assertEqual(limit.limit, 4)
+
+        # Failures of requests started with the previous limit are ignored.
+        self.record(limit, 7)
+        self.assertEqual(limit.limit, 4)
+
+        self.record(limit, 1, 0.01, 503)
+        self.assertEqual(limit.limit, 2)
+        self.assertEqual(limit.summary(), '2 (min 2, max 8)')
+
+    def test_limits(self):
+        limit = AdaptiveLimit(2, initial=5, window=1)
+        self.assertEqual(limit.limit, 2)
+
+        self.record(limit, 5)
+        self.assertEqual(limit.limit, 1)
+
+
+class AdaptiveRunnerTest(TestCase):
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_summary(self, _):
+        logger = SummaryLogger()
+        runner = PlansRunner(
+            [get_plan(name, 10) for name in 'abc'],
+            logger,
+            3,
+            adaptive=True)
+
+        self.assertEqual(runner.run(), 0)
+        self.assertEqual(logger.rows['Plans'], [3, 0, 3, 0])
+        self.assertEqual(logger.rows['Parallel'], '2 (min 1, max 2)')
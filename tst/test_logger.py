@@ -91,6 +91,66 @@ class ConsoleLoggerTest(TestCase):
 
         logger.close()
 
+    def test_buffered_output(self):
+        out = StringIO()
+        logger = ConsoleLogger(False, False, target=out, buffered=True)
+        logger.start()
+
+        logger.title('Plan', 2)
+        for _ in range(2):
+            request = get_sent_mock_request()
+            logger.start_request(request)
+            logger.finish_request(request)
+
+        self.assertEqual(out.getvalue(), '')
+        logger.close()
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[:2], ['Plan', 'Sending 2 requests:'])
+        self.assertEqual(
+            [i.rstrip() for i in lines if i.startswith('✓')],
+            ['✓ GET http://localhost:5000'] * 2)
+        self.assertNotIn('>', out.getvalue())
+
+    def test_buffered_output_flushes_when_full(self):
+        out = StringIO()
+        logger = ConsoleLogger(False, False, target=out, buffered=True)
+
+        with patch('yaml_requests.logger._console.BUFFER_SIZE', 2):
+            logger.title('Plan', 1)
+            self.assertEqual(out.getvalue(), '')
+            logger.finish_request(get_sent_mock_request())
+            self.assertIn('GET http://localhost:5000', out.getvalue())
+
+        logger.close()
+
+
+    def test_quiet_output(self):
+        out = StringIO()
+        logger = ConsoleLogger(False, False, target=out, quiet=True)
+
+        logger.title('Plan', 2)
+        logger.start()
+        ok_request = get_sent_mock_request()
+        logger.start_request(ok_request)
+        logger.finish_request(ok_request)
+        logger.close()
+
+        self.assertEqual(out.getvalue(), '')
+
+        logger.start()
+        failed_request = get_sent_mock_request(ok=False)
+        logger.start_request(failed_request)
+        logger.finish_request(failed_request)
+        logger.close()
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[:2], ['Plan', 'Sending 2 requests:'])
+        self.assertEqual(
+            [i.rstrip() for i in lines[2:] if i],
+            ['✗ GET http://localhost:5000', '  HTTP 500 (1.000 ms)'])
+
+
 class RequestLoggerTest(TestCase):
     def test_log_errored_request_with_asserts(self):
         logger = RequestLogger()
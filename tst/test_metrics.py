@@ -0,0 +1,146 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+
+from yaml_requests._plan import Plan
+from yaml_requests._runner import PlansRunner
+from yaml_requests.logger import RequestLogger
+from yaml_requests.utils.metrics import (
+    Counter,
+    Histogram,
+    Metrics,
+    MetricsServer,
+)
+
+from _utils import MockResponse
+
+
+class MetricTest(TestCase):
+    def test_counter(self):
+        counter = Counter('test_total', 'Test counter.', ('name',))
+        counter.inc(('a',))
+        counter.inc(('a',))
+        counter.inc(('b"\n',), 3)
+
+        self.assertEqual(counter.render(), [
+            '# HELP test_total Test counter.',
+            '# TYPE test_total counter',
+            'test_total{name="a"} 2.0',
+            'test_total{name="b\\"\\n"} 3.0',
+        ])
+
+    def test_histogram(self):
+        histogram = Histogram(
+            'test_seconds', 'Test histogram.', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe((), value)
+
+        self.assertEqual(histogram.render()[2:], [
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1.0"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 2.65',
+            'test_seconds_count 4',
+        ])
+
+
+class MetricsTest(TestCase):
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_repeated_plan(self, _):
+        plan = Plan._from_dict(dict(
+            name='monitor',
+            options=dict(repeat_while='repeat_index < 2'),
+            requests=[
+                dict(name='ok', get=dict(url='http://localhost:5000')),
+                dict(get=dict(url='http://localhost:5000'),
+                     assertions=['response.ok']),
+            ],
+        ))
+
+        metrics = Metrics()
+        runner = PlansRunner([plan], RequestLogger(), metrics=metrics)
+        self.assertEqual(runner.run(), 0)
+
+        self.assertEqual(
+            metrics.repeat_iterations.value(('monitor',)), 3)
+        self.assertEqual(
+            metrics.requests.value(('monitor', 'ok', 'success',)), 3)
+        self.assertEqual(
+            metrics.requests.value(
+                ('monitor', 'GET http://localhost:5000', 'success',)), 3)
+        self.assertIn(
+            'yaml_requests_request_duration_seconds_count'
+            '{plan="monitor",request="ok"} 3',
+            metrics.render())
+
+    @patch('yaml_requests._transport.request',
+           new_callable=lambda: MockResponse(ok=False))
+    def test_failures(self, _):
+        plan = Plan._from_dict(dict(
+            name='failing',
+            requests=[
+                dict(name='a', get=dict(url='http://localhost:5000'),
+                     assertions=['response.ok', 'True']),
+                dict(name='b', get=dict(url='http://localhost:5000')),
+            ],
+        ))
+
+        metrics = Metrics()
+        PlansRunner([plan], RequestLogger(), metrics=metrics).run()
+
+        self.assertEqual(
+            metrics.requests.value(('failing', 'a', 'failure',)), 1)
+        self.assertEqual(
+            metrics.requests.value(('failing', 'b', 'skipped',)), 1)
+        self.assertEqual(
+            metrics.assertion_failures.value(
+                ('failing', 'a', 'response.ok',)), 1)
+        self.assertEqual(
+            metrics.assertion_failures.value(('failing', 'a', 'True',)), 0)
+
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_loop_labels(self, _):
+        plan = Plan._from_dict(dict(
+            name='loop',
+            requests=[
+                dict(name='item {{ item }}',
+                     get=dict(url='http://localhost:5000/{{ item }}'),
+                     loop=list(range(300))),
+                dict(get=dict(url='http://localhost:5000/{{ item }}'),
+                     loop=list(range(300))),
+            ],
+        ))
+
+        metrics = Metrics()
+        PlansRunner([plan], RequestLogger(), metrics=metrics).run()
+
+        self.assertEqual(
+            metrics.requests.value(('loop', 'item {{ item }}', 'success',)),
+            300)
+        self.assertEqual(
+            metrics.requests.value(
+                ('loop', 'GET http://localhost:5000/{{ item }}', 'success',)),
+            300)
+        self.assertEqual(len(metrics.requests.render()), 4)
+        self.assertEqual(len(metrics.duration.render()), 2 + 2 * 14)
+
+
+class MetricsServerTest(TestCase):
+    def test_serves_metrics(self):
+        metrics = Metrics()
+        metrics.repeat_iterations.inc(('plan',))
+
+        server = MetricsServer(metrics, 0, '127.0.0.1')
+        server.start()
+        try:
+            response = requests.get(f'http://127.0.0.1:{server.port}/metrics')
+        finally:
+            server.stop()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.headers['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            'yaml_requests_repeat_iterations_total{plan="plan"} 1.0',
+            response.text)
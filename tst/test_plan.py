@@ -1,10 +1,13 @@
 import os
+from tempfile import TemporaryDirectory
 from unittest import TestCase, runner
+from unittest.mock import patch
 
-from yaml_requests.utils.args import load_plan_file
-from yaml_requests._plan import Plan
+from yaml_requests.utils.args import load_json_or_yaml_file, load_plan_file
+from yaml_requests._plan import Plan, build_plans, load_matrix
 from yaml_requests._runner import PlanRunner
 from yaml_requests.logger import ConsoleLogger
+from yaml_requests.utils.stats import plan_key
 
 from _utils import plan_path
 
@@ -43,3 +46,66 @@ class PlanTest(TestCase):
 
         self.assertEqual(session.headers.get('TEST-HEADER'), 'header-value')
         self.assertEqual(session.cookies.get('test-cookie'), 'cookie-value')
+
+    @patch('yaml_requests._plan.load_json_or_yaml_file', side_effect=load_json_or_yaml_file)
+    def test_variable_files_are_loaded_once(self, load_mock):
+        plan_dict = load_plan_file(plan_path('integration/loop.yml'))
+        plans, invalid_plans = build_plans(
+            [plan_dict, {**plan_dict, 'name': 'Copy'}], [], {})
+
+        self.assertEqual(len(plans), 2)
+        self.assertEqual(invalid_plans, [])
+        self.assertEqual(plans[0].variables, plans[1].variables)
+        self.assertEqual(load_mock.call_count, 1)
+
+
+class MatrixTest(TestCase):
+    def write(self, tmp, filename, content):
+        filename = os.path.join(tmp, filename)
+        with open(filename, 'w') as f:
+            f.write(content)
+        return filename
+
+    def test_load_matrix(self):
+        with TemporaryDirectory() as tmp:
+            csv_file = self.write(tmp, 'vars.csv', 'tenant,id\nacme,1\nbeta,2\n')
+            jsonl_file = self.write(
+                tmp, 'vars.jsonl', '{"tenant": "acme", "id": 1}\n\n{"tenant": "beta", "id": 2}\n')
+
+            self.assertEqual(
+                load_matrix(csv_file),
+                [dict(tenant='acme', id='1'), dict(tenant='beta', id='2')])
+            self.assertEqual(
+                load_matrix(jsonl_file),
+                [dict(tenant='acme', id=1), dict(tenant='beta', id=2)])
+
+            for filename in (
+                    self.write(tmp, 'vars.txt', ''),
+                    self.write(tmp, 'invalid.jsonl', '[1, 2]\n'),
+                    self.write(tmp, 'header.csv', 'tenant,id\n'),
+                    self.write(tmp, 'empty.jsonl', '\n'),
+                    os.path.join(tmp, 'missing.csv')):
+                with self.subTest(filename=filename):
+                    with self.assertRaises(AssertionError):
+                        load_matrix(filename)
+
+    def test_build_plans(self):
+        plan_dict = dict(
+            path='tenant.yml',
+            name='Tenant',
+            variables=dict(tenant='default', region='eu'),
+            requests=[dict(get=dict(url='http://localhost:5000'))],
+        )
+        matrix = [dict(tenant='acme'), dict(tenant='beta')]
+
+        plans, _ = build_plans(
+            [plan_dict], [], dict(tenant='override', region='us'), None, matrix)
+
+        self.assertEqual(
+            [plan.variables for plan in plans],
+            [dict(tenant='acme', region='us'), dict(tenant='beta', region='us')])
+        self.assertEqual(
+            [plan._title(True) for plan in plans],
+            ['Tenant (tenant.yml) [Row 1: tenant=acme]',
+             'Tenant (tenant.yml) [Row 2: tenant=beta]'])
+        self.assertNotEqual(plan_key(plans[0]), plan_key(plans[1]))
@@ -0,0 +1,168 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import socket
+from threading import Thread
+from time import monotonic, sleep
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from yaml_requests._plan import Plan
+from yaml_requests._preconnect import plan_origins, preconnect
+from yaml_requests._runner import PlansRunner
+from yaml_requests._transport import DnsCache, PooledTransport
+from yaml_requests.logger import RequestLogger
+from yaml_requests.utils.template import Environment
+
+
+STUB_HOST = 'stub.test'
+
+_getaddrinfo = socket.getaddrinfo
+
+
+class StubServer(ThreadingHTTPServer):
+    '''HTTP server that counts the connections it has accepted.'''
+
+    def __init__(self, host='127.0.0.1'):
+        self.address_family = (
+            socket.AF_INET6 if ':' in host else socket.AF_INET)
+        self.connections = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(handler):
+                self.connections += 1
+                super().setup()
+
+            def do_GET(handler):
+                handler.send_response(200)
+                handler.send_header('Content-Length', '2')
+                handler.end_headers()
+                handler.wfile.write(b'ok')
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__((host, 0), Handler)
+        self.daemon_threads = True
+        Thread(target=self.serve_forever, daemon=True).start()
+
+    def wait_for_connections(self, n, timeout=2.0):
+        # Connections are counted when the server has accepted them, which
+        # can happen after the client has connected.
+        deadline = monotonic() + timeout
+        while self.connections < n and monotonic() < deadline:
+            sleep(0.01)
+        return self.connections
+
+    @property
+    def url(self):
+        return f'http://{STUB_HOST}:{self.server_address[1]}'
+
+
+def get_plan(name, url, variables=None):
+    return Plan._from_dict(dict(
+        name=name,
+        variables=variables or {},
+        requests=[dict(get=dict(url=url))],
+    ))
+
+
+class PlanOriginsTest(TestCase):
+    def test_plan_origins(self):
+        plans = [
+            get_plan('literal', 'https://example.com/a?b=c'),
+            get_plan('duplicate', 'https://example.com/d'),
+            get_plan(
+                'variables',
+                '{{ base_url }}/items',
+                dict(base_url='http://localhost:8080')),
+            get_plan('response', '{{ response.json().next }}'),
+            get_plan('undefined', '{{ undefined }}/items'),
+            get_plan('scheme', 'ftp://example.com/file'),
+            Plan._from_dict(dict(
+                name='params',
+                requests=[
+                    dict(method='post', params=dict(url='http://[::1]/a')),
+                    dict(get=dict(url='http://user@[::1]:8080/a')),
+                    dict(name='invalid'),
+                ],
+            )),
+        ]
+
+        self.assertEqual(plan_origins(plans, Environment()), [
+            'https://example.com',
+            'http://localhost:8080',
+            'http://[::1]',
+            'http://[::1]:8080',
+        ])
+
+
+class PreconnectTest(TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.lookups = []
+
+        def getaddrinfo(host, *args, **kwargs):
+            if host == STUB_HOST:
+                self.lookups.append(host)
+                host = '127.0.0.1'
+            return _getaddrinfo(host, *args, **kwargs)
+
+        patcher = patch('socket.getaddrinfo', side_effect=getaddrinfo)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dns_cache(self):
+        cache = DnsCache()
+        for _ in range(2):
+            self.assertEqual(cache.resolve(STUB_HOST, 80), ['127.0.0.1'])
+
+        self.assertEqual(self.lookups, [STUB_HOST])
+
+    def test_preconnect(self):
+        transport = PooledTransport(DnsCache())
+        self.addCleanup(transport.close)
+
+        plans = [get_plan(name, f'{self.server.url}/{name}') for name in 'ab']
+        preconnect(transport, plans, Environment()).join()
+        self.assertEqual(self.server.wait_for_connections(1), 1)
+
+        for name in 'ab':
+            response = transport.request('GET', f'{self.server.url}/{name}')
+            self.assertEqual(response.text, 'ok')
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.lookups, [STUB_HOST])
+
+    @skipUnless(socket.has_ipv6, 'IPv6 is not supported')
+    def test_ipv6(self):
+        try:
+            server = StubServer('::1')
+        except OSError:
+            self.skipTest('IPv6 loopback is not available')
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        transport = PooledTransport(DnsCache())
+        self.addCleanup(transport.close)
+
+        url = f'http://[::1]:{server.server_address[1]}'
+        preconnect(transport, [get_plan('a', url)], Environment()).join()
+        self.assertEqual(server.wait_for_connections(1), 1)
+
+        self.assertEqual(transport.request('GET', url).text, 'ok')
+        self.assertEqual(server.connections, 1)
+
+    def test_runner(self):
+        plans = [
+            get_plan(name, '{{ url }}/' + name, dict(url=self.server.url))
+            for name in 'abc'
+        ]
+
+        runner = PlansRunner(plans, RequestLogger(), 2, preconnect=True)
+        self.assertEqual(runner.run(), 0)
+
+        self.assertEqual(self.lookups, [STUB_HOST])
@@ -0,0 +1,65 @@
+import os
+import pstats
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+from unittest import TestCase
+
+from yaml_requests.utils.profile import PhaseTimer, Profiler, _get_phase
+
+
+def busy_wait(seconds):
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        pass
+
+
+class PhaseTimerTest(TestCase):
+    def test_phases(self):
+        timer = PhaseTimer()
+        with timer.phase('First'):
+            sleep(0.01)
+        with timer.phase('Second'):
+            pass
+
+        names = [name for name, _ in timer.phases]
+        self.assertEqual(names, ['First', 'Second'])
+        self.assertGreaterEqual(timer.phases[0][1], 0.01)
+        self.assertTrue(timer.rows[0][1].endswith(' s'))
+
+
+class ProfilerTest(TestCase):
+    def test_get_phase(self):
+        for stack, expected in [
+            ((('MainThread', ''), ('yaml_requests._main', 'run'),
+              ('yaml', 'load'),), 'YAML parsing'),
+            ((('MainThread', ''), ('jinja2.environment', 'from_string'),
+              ('jinja2.compiler', 'generate'),), 'Template compilation'),
+            ((('MainThread', ''), ('yaml_requests.logger._console', 'title'),
+              ('jinja2.environment', 'render'),), 'Template rendering'),
+            ((('MainThread', ''), ('urllib3.connection', 'connect'),
+              ('socket', 'create_connection'),), 'Network'),
+            ((('Thread-1', ''), ('ciou.progress._progress', '_run'),
+              ('queue', 'get'),), None),
+            ((('MainThread', ''), ('yaml_requests._main', 'run'),), None),
+        ]:
+            with self.subTest(stack=stack):
+                self.assertEqual(_get_phase(stack), expected)
+
+    def test_output_files(self):
+        with TemporaryDirectory() as tmp:
+            stats_file = os.path.join(tmp, 'profile.stats')
+            collapsed_file = os.path.join(tmp, 'profile.txt')
+
+            profiler = Profiler(stats_file, collapsed_file)
+            profiler.start()
+            busy_wait(0.05)
+            profiler.stop()
+
+            pstats.Stats(stats_file)
+            with open(collapsed_file, 'r') as f:
+                lines = f.read().splitlines()
+
+            stacks = [line.rsplit(' ', 1)[0] for line in lines]
+            self.assertTrue(any(
+                i.startswith('MainThread;') and i.endswith(':busy_wait')
+                for i in stacks))
@@ -1,10 +1,12 @@
 from copy import deepcopy
+import os
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 from jinja2.exceptions import TemplateError
 
 from yaml_requests.utils.template import Environment
-from yaml_requests._request import ParsedAssertion, ParsedRequest, RequestState, parse_request_loop
+from yaml_requests._request import ParsedAssertion, ParsedRequest, RequestResult, RequestState, parse_request_loop
 
 from _utils import MockResponse, REQUEST_WITH_ASSERT
 
@@ -161,6 +163,40 @@ class RequestTest(TestCase):
         req.send(MockResponse(True))
         self.assertEqual(req.state, RequestState.FAILURE)
 
+    def test_result(self):
+        env = Environment()
+        env.register('var', 3)
+        request_dict = {
+            **REQUEST_WITH_ASSERT,
+            'assertions': ['var == 3', 'var == 4', 'var == 3'],
+        }
+
+        req = ParsedRequest(request_dict, env)
+        req.send(MockResponse(True))
+        result = req.result()
+
+        self.assertIsInstance(result, RequestResult)
+        self.assertEqual(result.state, RequestState.FAILURE)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.elapsed_ns, 1000000)
+        self.assertEqual(result.n_assertions, 3)
+        self.assertEqual(
+            [result.assertion_ok(i) for i in range(3)], [True, False, True])
+
+        with self.assertRaises(AttributeError):
+            result.state = RequestState.SUCCESS
+
+    def test_result_without_response(self):
+        req = ParsedRequest(REQUEST_WITH_ASSERT, Environment(), skip=True)
+        result = req.result()
+
+        self.assertEqual(result.state, RequestState.SKIPPED)
+        self.assertTrue(result.ok)
+        self.assertIsNone(result.status_code)
+        self.assertIsNone(result.elapsed_ns)
+        self.assertEqual(result.assertions, 0)
+
     def test_parse_request_loop(self):
         env = Environment()
         args_loop = parse_request_loop(REQUEST_WITH_LOOP, env)
@@ -170,3 +206,57 @@ class RequestTest(TestCase):
             request_dict, template_env, context = args
             req = ParsedRequest(request_dict, template_env, False, context)
             self.assertEqual(req.params['url'], f'http://localhost:5000/items/{i+1}')
+
+    def test_parse_request_loop_file(self):
+        with TemporaryDirectory() as tmp:
+            files = {
+                'items.csv': 'id,name\n1,a\n2,"b, c"\n',
+                'items.jsonl': '{"id": 1, "name": "a"}\n\n'
+                               '{"id": 2, "name": "b, c"}\n',
+                'items.txt': 'id;name\n1;a\n2;b, c\n',
+            }
+            for filename, content in files.items():
+                with open(os.path.join(tmp, filename), 'w') as f:
+                    f.write(content)
+
+            for loop_file, ids in [
+                (os.path.join(tmp, 'items.csv'), ['1', '2']),
+                (os.path.join(tmp, 'items.jsonl'), [1, 2]),
+                (dict(path=os.path.join(tmp, 'items.jsonl'), format='jsonl'),
+                 [1, 2]),
+            ]:
+                with self.subTest(loop_file=loop_file):
+                    request_dict = dict(
+                        name='Get {{ item.name }}',
+                        get=dict(url='http://localhost:5000/{{ item.id }}'),
+                        loop_file=loop_file)
+
+                    args_loop = parse_request_loop(request_dict, Environment())
+                    self.assertNotIsInstance(args_loop, list)
+
+                    requests = [
+                        ParsedRequest(d, env, False, context)
+                        for d, env, context in args_loop]
+                    self.assertEqual(
+                        [i.params['url'] for i in requests],
+                        [f'http://localhost:5000/{i}' for i in ids])
+                    self.assertEqual(requests[1].name, 'Get b, c')
+
+            with self.assertRaises(AssertionError):
+                parse_request_loop(
+                    dict(loop_file=os.path.join(tmp, 'items.txt')),
+                    Environment())
+
+    def test_parse_request_loop_file_is_read_lazily(self):
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'items.jsonl')
+            with open(filename, 'w') as f:
+                f.write('{"id": 1}\nnot json\n')
+
+            args_loop = parse_request_loop(
+                dict(loop_file=filename), Environment())
+
+            _, _, context = next(args_loop)
+            self.assertEqual(context, dict(item=dict(id=1)))
+            with self.assertRaises(AssertionError):
+                next(args_loop)
@@ -0,0 +1,379 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from yaml_requests._plan import Plan, build_plans
+from yaml_requests._runner import PlansRunner
+from yaml_requests.logger import RequestLogger
+from yaml_requests.utils.stats import FAILED, PASSED, PlanStats
+
+from _utils import MockResponse
+
+
+class SummaryLogger(RequestLogger):
+    def summary(self, rows):
+        self.rows = dict(rows)
+
+
+def mock_request(method, url, **kwargs):
+    return MockResponse(ok='fail' not in url)
+
+
+def get_plan(name, n_requests=1):
+    return Plan._from_dict(dict(
+        name=name,
+        path=f'{name}.yml',
+        requests=[
+            dict(get=dict(url=f'http://localhost:5000/{name}/{i}'))
+            for i in range(n_requests)
+        ],
+    ))
+
+
+class PlanStatsTest(TestCase):
+    def test_longest_first(self):
+        a, b, c = get_plan('a'), get_plan('b'), get_plan('c')
+
+        stats = PlanStats()
+        stats.record(a, 1.0)
+        stats.record(b, 3.0)
+
+        self.assertEqual(stats.longest_first([a, b, c]), [c, b, a])
+
+    def test_save_and_load(self):
+        a = get_plan('a')
+
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'stats.json')
+
+            stats = PlanStats(filename)
+            self.assertIsNone(stats.duration(a))
+            stats.record(a, 2.5)
+            stats.save()
+
+            self.assertEqual(PlanStats(filename).duration(a), 2.5)
+
+    def test_reads_files_of_earlier_versions(self):
+        a = get_plan('a')
+
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'stats.json')
+            with open(filename, 'w') as f:
+                json.dump({os.path.realpath('a.yml'): dict(duration=2.5)}, f)
+
+            stats = PlanStats(filename)
+            self.assertEqual(stats.duration(a), 2.5)
+            self.assertIsNone(stats.outcome(a))
+
+    def test_resume(self):
+        a, b = get_plan('a'), get_plan('b')
+
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'stats.json')
+
+            stats = PlanStats(filename)
+            stats.start()
+            stats.record(a, 1.0, FAILED)
+            stats.save()
+
+            # The run was interrupted.
+            stats = PlanStats(filename)
+            stats.start(resume=True)
+            self.assertTrue(stats.completed(a))
+            self.assertFalse(stats.completed(b))
+            stats.record(b, 1.0, PASSED)
+            stats.finish()
+
+            stats = PlanStats(filename)
+            stats.start(resume=True)
+            self.assertFalse(stats.completed(a))
+            self.assertEqual(stats.outcome(a), FAILED)
+            self.assertEqual(stats.outcome(b), PASSED)
+
+    def test_invalid_file_is_ignored(self):
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'stats.json')
+            with open(filename, 'w') as f:
+                f.write('not json')
+
+            self.assertIsNone(PlanStats(filename).duration(get_plan('a')))
+
+
+class PlansRunnerTest(TestCase):
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_records_durations(self, _):
+        plans = [get_plan(name) for name in 'abc']
+
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'stats.json')
+            for parallel in (1, 3):
+                with self.subTest(parallel=parallel):
+                    runner = PlansRunner(
+                        plans, RequestLogger(), parallel, filename)
+                    self.assertEqual(runner.run(), 0)
+
+                    with open(filename, 'r') as f:
+                        data = json.load(f)
+                    self.assertEqual(len(data['plans']), 3)
+                    self.assertTrue(data['complete'])
+
+    @patch('yaml_requests._transport.request', side_effect=mock_request)
+    def test_fail_fast(self, *_):
+        plans = [get_plan('fail'), get_plan('a', 3), get_plan('b', 3)]
+
+        for parallel in (1, 2):
+            with self.subTest(parallel=parallel):
+                logger = SummaryLogger()
+                runner = PlansRunner(plans, logger, parallel, fail_fast=True)
+                self.assertEqual(runner.run(), 1)
+
+                passed, failed, total, skipped = logger.rows['Plans']
+                self.assertEqual(failed, 1)
+                self.assertEqual(total, 3)
+                self.assertEqual(passed + skipped, 2)
+                if parallel == 1:
+                    self.assertEqual(skipped, 2)
+
+    @patch('yaml_requests._transport.request', side_effect=mock_request)
+    def test_without_fail_fast(self, *_):
+        plans = [get_plan('fail'), get_plan('a'), get_plan('b')]
+
+        logger = SummaryLogger()
+        runner = PlansRunner(plans, logger, 1)
+        self.assertEqual(runner.run(), 1)
+        self.assertEqual(logger.rows['Plans'], [2, 1, 3, 0])
+
+    @patch('yaml_requests._transport.request', side_effect=mock_request)
+    def test_on_result(self, *_):
+        plans = [get_plan('fail'), get_plan('a', 2)]
+        results = []
+
+        runner = PlansRunner(
+            plans,
+            RequestLogger(),
+            1,
+            on_result=lambda plan, result: results.append((plan, result)))
+        runner.run()
+
+        self.assertEqual(
+            [(plan.name, result.state) for plan, result in results],
+            [('fail', 'FAILURE'), ('a', 'SUCCESS'), ('a', 'SUCCESS')])
+
+    @patch('yaml_requests._transport.request', side_effect=mock_request)
+    def test_loop_file_errors(self, request_mock):
+        with TemporaryDirectory() as tmp:
+            broken = os.path.join(tmp, 'broken.jsonl')
+            with open(broken, 'w') as f:
+                f.write('{"id": 1}\n{bad\n{"id": 3}\n')
+
+            def get_loop_plan(name, loop_file):
+                return Plan._from_dict(dict(
+                    name=name,
+                    path=f'{name}.yml',
+                    requests=[dict(
+                        get=dict(url='http://localhost:5000/{{ item.id }}'),
+                        loop_file=loop_file,
+                    )],
+                ))
+
+            plans = [
+                get_loop_plan('broken', broken),
+                get_loop_plan('missing', os.path.join(tmp, 'missing.csv')),
+                get_loop_plan('format', os.path.join(tmp, 'items.txt')),
+                get_plan('a'),
+            ]
+            results = []
+
+            logger = SummaryLogger()
+            runner = PlansRunner(
+                plans,
+                logger,
+                1,
+                on_result=lambda plan, result: results.append(
+                    (plan.name, result.state)))
+            self.assertEqual(runner.run(), 3)
+
+        self.assertEqual(results, [
+            ('broken', 'SUCCESS'),
+            ('broken', 'ERROR'),
+            ('missing', 'ERROR'),
+            ('format', 'ERROR'),
+            ('a', 'SUCCESS'),
+        ])
+        self.assertEqual(logger.rows['Plans'], [1, 3, 4, 0])
+        self.assertEqual(request_mock.call_count, 2)
+
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_repeat_delay_does_not_occupy_worker(self, _):
+        plans = [
+            Plan._from_dict(dict(
+                name=name,
+                path=f'{name}.yml',
+                options=dict(
+                    repeat_while='repeat_index < 1', repeat_delay=0.2),
+                requests=[dict(get=dict(url='http://localhost:5000'))],
+            ))
+            for name in ('repeated_1', 'repeated_2')
+        ]
+        results = []
+
+        runner = PlansRunner(
+            plans + [get_plan('a')],
+            RequestLogger(),
+            2,
+            on_result=lambda plan, result: results.append(plan.name))
+        self.assertEqual(runner.run(), 0)
+
+        self.assertEqual(len(results), 5)
+        self.assertIn('a', results[:3])
+
+    @patch('yaml_requests._transport.request', side_effect=mock_request)
+    def test_matrix_summary(self, *_):
+        plan_dicts = [
+            dict(
+                path=f'{name}.yml',
+                requests=[dict(get=dict(
+                    url=f'http://localhost:5000/{name}/{{{{ tenant }}}}'))],
+            )
+            for name in ('a', 'b')
+        ]
+        matrix = [dict(tenant='acme'), dict(tenant='fail')]
+        plans, _ = build_plans(plan_dicts, [], {}, None, matrix)
+
+        for parallel in (1, 2):
+            with self.subTest(parallel=parallel):
+                logger = SummaryLogger()
+                runner = PlansRunner(plans, logger, parallel)
+
+                self.assertEqual(runner.run(), 2)
+                self.assertEqual(logger.rows['Plans'], [2, 2, 4, 0])
+                self.assertEqual(
+                    logger.rows['Row 1: tenant=acme'], [2, 0, 2, 0])
+                self.assertEqual(
+                    logger.rows['Row 2: tenant=fail'], [0, 2, 2, 0])
+
+    @patch('yaml_requests._transport.request', side_effect=mock_request)
+    def test_last_failed_and_resume(self, request_mock):
+        plans = [get_plan('fail'), get_plan('a'), get_plan('b')]
+
+        def run(**kwargs):
+            request_mock.reset_mock()
+            try:
+                PlansRunner(
+                    plans, RequestLogger(), 1, filename, **kwargs).run()
+            except KeyboardInterrupt:
+                pass
+            return [call.args[1].split('/')[3]
+                    for call in request_mock.call_args_list]
+
+        def interrupt(method, url, **kwargs):
+            if url.endswith('/b/0'):
+                raise KeyboardInterrupt()
+            return mock_request(method, url, **kwargs)
+
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'stats.json')
+
+            self.assertEqual(run(last_failed=True), ['fail', 'a', 'b'])
+            self.assertEqual(run(last_failed=True), ['fail'])
+
+            request_mock.side_effect = interrupt
+            self.assertEqual(run(), ['fail', 'a', 'b'])
+            request_mock.side_effect = mock_request
+
+            self.assertEqual(run(resume=True), ['b'])
+            self.assertEqual(run(resume=True), ['fail', 'a', 'b'])
+
+
+class SetupTest(TestCase):
+    def setUp(self):
+        self.urls = []
+
+        def request(method, url, **kwargs):
+            self.urls.append(url)
+            return mock_request(method, url, **kwargs)
+
+        patcher = patch(
+            'yaml_requests._transport.request', side_effect=request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_fixture(self, name, url):
+        return Plan._from_dict(dict(
+            name=name,
+            path=f'{name}.yml',
+            requests=[dict(get=dict(url=url), register='login')],
+        ))
+
+    def get_plan(self, name):
+        return Plan._from_dict(dict(
+            name=name,
+            path=f'{name}.yml',
+            requests=[dict(get=dict(
+                url=f'http://localhost:5000/{name}/'
+                    '{{ login.json().message | length }}'))],
+        ))
+
+    def test_registered_variables_are_shared(self):
+        for parallel in (1, 2):
+            with self.subTest(parallel=parallel):
+                self.urls.clear()
+                logger = SummaryLogger()
+                runner = PlansRunner(
+                    [self.get_plan('a'), self.get_plan('b')],
+                    logger,
+                    parallel,
+                    setup=self.get_fixture(
+                        'setup', 'http://localhost:5000/login'),
+                    teardown=self.get_fixture(
+                        'teardown', 'http://localhost:5000/logout'))
+
+                self.assertEqual(runner.run(), 0)
+                self.assertEqual(logger.rows['Plans'], [2, 0, 2, 0])
+                self.assertEqual(logger.rows['Requests'], [4, 0, 4])
+                self.assertEqual(self.urls[0], 'http://localhost:5000/login')
+                self.assertEqual(
+                    sorted(self.urls[1:3]),
+                    ['http://localhost:5000/a/25',
+                     'http://localhost:5000/b/25'])
+                self.assertEqual(self.urls[3], 'http://localhost:5000/logout')
+
+    def test_templated_register_name(self):
+        setup = Plan._from_dict(dict(
+            name='setup',
+            path='setup.yml',
+            variables=dict(name='login'),
+            requests=[dict(
+                get=dict(url='http://localhost:5000/login'),
+                register='{{ name }}')],
+        ))
+
+        logger = SummaryLogger()
+        runner = PlansRunner([self.get_plan('a')], logger, 1, setup=setup)
+
+        self.assertEqual(runner.run(), 0)
+        self.assertEqual(self.urls[1], 'http://localhost:5000/a/25')
+
+    def test_failed_setup_skips_plans(self):
+        logger = SummaryLogger()
+        cancelled = []
+        logger.cancelled_plan = lambda *args: cancelled.append(args)
+        runner = PlansRunner(
+            [self.get_plan('a'), self.get_plan('b')],
+            logger,
+            1,
+            setup=self.get_fixture('setup', 'http://localhost:5000/fail'),
+            teardown=self.get_fixture(
+                'teardown', 'http://localhost:5000/logout'))
+
+        self.assertEqual(runner.run(), 1)
+        self.assertEqual(logger.rows['Plans'], [0, 0, 2, 2])
+        self.assertEqual(
+            self.urls,
+            ['http://localhost:5000/fail', 'http://localhost:5000/logout'])
+        self.assertEqual(cancelled, [
+            (title, 'Plan skipped because the setup plan failed.')
+            for title in ('a (a.yml)', 'b (b.yml)')
+        ])
@@ -0,0 +1,85 @@
+from threading import Event, current_thread
+from time import monotonic, sleep
+from unittest import TestCase
+
+from yaml_requests.utils.scheduler import Scheduler
+
+
+class SchedulerTest(TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(1)
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def test_delayed_task_does_not_occupy_worker(self):
+        order = []
+
+        self.scheduler.submit(order.append, 'delayed', delay=0.2)
+        self.scheduler.submit(order.append, 'immediate')
+        self.scheduler.join()
+
+        self.assertEqual(order, ['immediate', 'delayed'])
+
+    def test_tasks_can_submit_tasks(self):
+        calls = []
+
+        def task(n):
+            calls.append((n, monotonic()))
+            if n < 3:
+                self.scheduler.submit(task, n + 1, delay=0.05)
+
+        start = monotonic()
+        self.scheduler.submit(task, 0)
+        self.scheduler.join()
+
+        self.assertEqual([n for n, _ in calls], [0, 1, 2, 3])
+        self.assertGreaterEqual(calls[-1][1] - start, 0.15)
+
+    def test_join_raises_task_error(self):
+        def task():
+            raise ValueError('failed')
+
+        self.scheduler.submit(task)
+        with self.assertRaisesRegex(ValueError, 'failed'):
+            self.scheduler.join()
+
+    def test_wake_all(self):
+        threads = []
+        done = Event()
+
+        def task():
+            threads.append(current_thread())
+            done.set()
+
+        self.scheduler.submit(task, delay=60)
+        self.scheduler.wake_all()
+
+        self.assertTrue(done.wait(5))
+        self.scheduler.join()
+        self.assertEqual(len(threads), 1)
+
+    def test_set_limit(self):
+        scheduler = Scheduler(3, limit=1)
+        running = []
+        counts = []
+
+        def task():
+            running.append(None)
+            counts.append(len(running))
+            sleep(0.05)
+            running.pop()
+
+        try:
+            for _ in range(3):
+                scheduler.submit(task)
+            scheduler.join()
+            self.assertEqual(max(counts), 1)
+
+            scheduler.set_limit(3)
+            for _ in range(3):
+                scheduler.submit(task)
+            scheduler.join()
+            self.assertEqual(max(counts[3:]), 3)
+        finally:
+            scheduler.close()
@@ -2,11 +2,19 @@ import json
 import os
 import yaml
 
-from jinja2.exceptions import UndefinedError
+from jinja2.exceptions import TemplateError, UndefinedError
 
-from unittest import TestCase
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
 
-from yaml_requests.utils.template import Environment
+from yaml_requests.utils.template import (
+    Environment,
+    FileCache,
+    MappedFile,
+    TemplateCache,
+)
 
 TST_DIR = os.path.dirname(os.path.realpath(__file__))
 with open(os.path.join(TST_DIR, 'template_test_data.yml'), 'r') as f:
@@ -48,6 +56,78 @@ class TemplateTest(TestCase):
         content = env.resolve_templates(wrap(f' lookup("file", "file_lookup_test_data.txt")'))
         self.assertEqual(content, "Thu Nov 28 00:05:47 EET 2024")
 
+    def test_lookup_file_is_cached(self):
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'data.txt')
+            with open(filename, 'w') as f:
+                f.write('first')
+
+            env = Environment()
+            template = wrap(f' lookup("file", {json.dumps(filename)})')
+            self.assertEqual(env.resolve_templates(template), 'first')
+
+            with patch('builtins.open', side_effect=AssertionError):
+                self.assertEqual(env.resolve_templates(template), 'first')
+
+            with open(filename, 'w') as f:
+                f.write('second value')
+            self.assertEqual(env.resolve_templates(template), 'second value')
+
+    def test_open_mapped(self):
+        path = os.path.join(TST_DIR, "file_lookup_test_data.txt")
+        with open(path, 'rb') as f:
+            expected = f.read()
+
+        cache = FileCache()
+        env = Environment(file_cache=cache)
+        f = env.resolve_templates(wrap(f' open({json.dumps(path)}) '))
+
+        self.assertIsInstance(f, MappedFile)
+        self.assertEqual(f.name, path)
+        self.assertEqual(len(f), len(expected))
+        self.assertEqual(f.read(3), expected[:3])
+        self.assertEqual(f.tell(), 3)
+        self.assertEqual(f.read(), expected[3:])
+        f.seek(0)
+        self.assertEqual(f.read(), expected)
+
+        other = env.resolve_templates(wrap(f' open({json.dumps(path)}) '))
+        self.assertEqual(other.read(), expected)
+
+        cache.close()
+
+    def test_open_empty_file(self):
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'empty.txt')
+            open(filename, 'w').close()
+
+            f = Environment().open(filename)
+            self.assertEqual(f.read(), b'')
+            f.close()
+
+    @skipUnless(hasattr(os, 'mkfifo'), 'Named pipes are not supported')
+    def test_open_pipe(self):
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'pipe')
+            os.mkfifo(filename)
+
+            def write():
+                with open(filename, 'wb') as f:
+                    f.write(b'data')
+
+            writer = Thread(target=write)
+            writer.start()
+            with Environment().open(filename) as f:
+                self.assertEqual(f.read(), b'data')
+            writer.join()
+
+    def test_open_unmappable_file(self):
+        path = os.path.join(TST_DIR, "file_lookup_test_data.txt")
+        with patch('mmap.mmap', side_effect=OSError('not supported')):
+            with Environment().open(path) as f:
+                self.assertNotIsInstance(f, MappedFile)
+                self.assertTrue(f.read())
+
     def test_lookup_env(self):
         env = Environment(path=__file__)
 
@@ -68,3 +148,76 @@ class TemplateTest(TestCase):
         env = Environment()
         with self.assertRaises(UndefinedError):
             env.resolve_templates('{{ undefined_var }}')
+
+
+class PlanOverlayTest(TestCase):
+    def test_globals_are_isolated(self):
+        base = Environment()
+        base.register('shared', 1)
+
+        a, b = base.plan_overlay(), base.plan_overlay()
+        a.register('name', 'a')
+        b.register('name', 'b')
+        b.register('shared', 2)
+
+        self.assertEqual(a.resolve_templates('{{ name }}'), 'a')
+        self.assertEqual(b.resolve_templates('{{ name }}'), 'b')
+        self.assertEqual(a.resolve_expression('shared + 1'), 2)
+        self.assertEqual(b.resolve_expression('shared + 1'), 3)
+        self.assertNotIn('name', base.globals)
+        self.assertIs(a.globals['lookup'].__self__, a)
+
+    def test_templates_are_compiled_once(self):
+        base = Environment()
+        overlays = [base.plan_overlay() for _ in range(3)]
+
+        with patch.object(
+                TemplateCache, 'get', autospec=True,
+                side_effect=TemplateCache.get) as get, \
+                patch.object(Environment, 'compile', autospec=True,
+                             side_effect=Environment.compile) as compile:
+            for i, env in enumerate(overlays):
+                env.register('repeat_index', i)
+                for _ in range(2):
+                    self.assertEqual(
+                        env.resolve_templates('{{ repeat_index }}'), i)
+                    self.assertEqual(
+                        env.resolve_expression('repeat_index == 1'), i == 1)
+
+        # The templates are looked up from the shared cache once per
+        # environment and compiled once per run.
+        self.assertEqual(get.call_count, 6)
+        self.assertEqual(compile.call_count, 2)
+
+    def test_disk_cache(self):
+        with TemporaryDirectory() as tmp:
+            def _resolve():
+                env = Environment(template_cache=TemplateCache(tmp))
+                env.register('value', 2)
+                return (
+                    env.resolve_templates('{{ value * 2 }}'),
+                    env.resolve_expression('value == 2'),
+                )
+
+            with patch.object(Environment, 'compile', autospec=True,
+                              side_effect=Environment.compile) as compile:
+                self.assertEqual(_resolve(), (4, True))
+                self.assertEqual(compile.call_count, 2)
+                self.assertEqual(len(os.listdir(tmp)), 2)
+
+                self.assertEqual(_resolve(), (4, True))
+                self.assertEqual(compile.call_count, 2)
+
+                for filename in os.listdir(tmp):
+                    with open(os.path.join(tmp, filename), 'wb') as f:
+                        f.write(b'invalid')
+
+                self.assertEqual(_resolve(), (4, True))
+                self.assertEqual(compile.call_count, 4)
+
+    def test_expression_syntax_error(self):
+        env = Environment().plan_overlay()
+        with self.assertRaises(TemplateError):
+            env.resolve_expression('1 +')
+        with self.assertRaises(TemplateError):
+            env.resolve_expression('1 2')
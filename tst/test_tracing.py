@@ -0,0 +1,166 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from yaml_requests._plan import Plan
+from yaml_requests._runner import PlanRunner, PlansRunner
+from yaml_requests.logger import RequestLogger
+from yaml_requests.tracing import (
+    FileExporter,
+    Tracer,
+    STATUS_ERROR,
+    STATUS_OK,
+    STATUS_UNSET,
+)
+
+from _utils import MockResponse
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.exports = []
+
+    def export(self, data):
+        self.exports.append(data)
+
+    @property
+    def spans(self):
+        return [
+            span
+            for data in self.exports
+            for resource_spans in data['resourceSpans']
+            for scope_spans in resource_spans['scopeSpans']
+            for span in scope_spans['spans']
+        ]
+
+
+class FailingExporter:
+    def export(self, data):
+        raise ConnectionError('Connection refused')
+
+
+def get_plan(name, requests, **options):
+    return Plan._from_dict(dict(
+        name=name,
+        path=f'{name}.yml',
+        options=options,
+        requests=requests,
+    ))
+
+
+class TracerTest(TestCase):
+    def test_nested_spans(self):
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter)
+
+        with tracer.span('parent') as parent:
+            with tracer.span('child') as child:
+                child.add_event('event', dict(key='value'))
+            with self.assertRaises(ValueError):
+                with tracer.span('failing'):
+                    raise ValueError('failed')
+
+        self.assertIsNone(tracer.current_span)
+        self.assertEqual(exporter.exports, [])
+        tracer.flush()
+
+        child, failing, parent = exporter.spans
+        self.assertNotIn('parentSpanId', parent)
+        for span in (child, failing):
+            self.assertEqual(span['traceId'], parent['traceId'])
+            self.assertEqual(span['parentSpanId'], parent['spanId'])
+
+        self.assertEqual(child['events'][0]['name'], 'event')
+        self.assertEqual(
+            failing['status'], dict(code=STATUS_ERROR, message='failed'))
+
+    def test_file_exporter(self):
+        with TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'traces.jsonl')
+            tracer = Tracer(FileExporter(filename))
+
+            for _ in range(2):
+                with tracer.span('span'):
+                    pass
+                tracer.flush()
+
+            with open(filename, 'r') as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual(len(lines), 2)
+        resource = lines[0]['resourceSpans'][0]['resource']
+        self.assertEqual(resource['attributes'], [dict(
+            key='service.name', value=dict(stringValue='yaml_requests'))])
+
+    def test_failing_export(self):
+        tracer = Tracer(FailingExporter())
+        with tracer.span('span'):
+            pass
+        tracer.flush()
+
+        self.assertIsInstance(tracer.error, ConnectionError)
+
+
+class PlanRunnerTracingTest(TestCase):
+    @patch('yaml_requests._transport.request')
+    def test_spans(self, request):
+        request.side_effect = lambda method, url, **kwargs: MockResponse(
+            ok='fail' not in url)
+
+        exporter = MemoryExporter()
+        plan = get_plan('plan', [
+            dict(name='ok', get=dict(url='http://localhost:5000/ok'),
+                 assertions=['response.ok', 'False']),
+            dict(get=dict(url='http://localhost:5000/fail')),
+        ], ignore_errors=True)
+
+        runner = PlansRunner([plan], RequestLogger(), tracer=Tracer(exporter))
+        self.assertEqual(runner.run(), 2)
+
+        self.assertEqual(len(exporter.spans), 5)
+        spans = {span['name']: span for span in exporter.spans}
+
+        plan_span = spans['plan']
+        self.assertEqual(plan_span['status']['code'], STATUS_ERROR)
+
+        ok = spans['ok']
+        self.assertEqual(ok['parentSpanId'], plan_span['spanId'])
+        self.assertEqual(
+            [event['attributes'][1]['value'] for event in ok['events']],
+            [dict(boolValue=True), dict(boolValue=False)])
+
+        failed = spans['GET http://localhost:5000/fail']
+        self.assertEqual(failed['status']['code'], STATUS_ERROR)
+
+        client_spans = [i for i in exporter.spans if i['name'] == 'GET']
+        self.assertEqual(
+            sorted(i['parentSpanId'] for i in client_spans),
+            sorted((ok['spanId'], failed['spanId'])))
+
+        traceparents = [
+            call.kwargs['headers']['traceparent']
+            for call in request.call_args_list]
+        self.assertEqual(traceparents, [
+            f'00-{i["traceId"]}-{i["spanId"]}-01' for i in client_spans])
+
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_no_tracer(self, request):
+        plan = get_plan('plan', [dict(get=dict(url='http://localhost:5000'))])
+        runner = PlanRunner(plan, RequestLogger())
+
+        self.assertEqual(runner.run(), [1, 0, 1])
+
+    @patch('yaml_requests._transport.request', new_callable=MockResponse)
+    def test_ok_status(self, _):
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter)
+        plan = get_plan('plan', [dict(get=dict(url='http://localhost:5000'))])
+
+        PlanRunner(plan, RequestLogger(), tracer=tracer).run()
+        tracer.flush()
+
+        self.assertEqual(
+            [span['status']['code'] for span in exporter.spans],
+            [STATUS_UNSET, STATUS_OK, STATUS_OK])
@@ -0,0 +1,447 @@
+from datetime import timedelta
+import os
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import sleep
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from requests import Response
+from requests.exceptions import RequestException
+from requests.structures import CaseInsensitiveDict
+
+from yaml_requests._plan import Plan
+from yaml_requests._runner import PlansRunner
+from yaml_requests._transport import (
+    CachingTransport,
+    CassettePlayer,
+    CassetteRecorder,
+    CoalescingTransport,
+    Http2Transport,
+    HttpCache,
+    RecordingTransport,
+    ReplayTransport,
+    RequestCoalescer,
+    parse_match,
+)
+from yaml_requests.logger import RequestLogger
+
+try:
+    import httpx
+    from server.h2 import H2Server
+except ImportError:
+    httpx = None
+
+
+@skipUnless(httpx, 'httpx with HTTP/2 support is not installed')
+class Http2TransportTest(TestCase):
+    def setUp(self):
+        self._server = H2Server()
+        self._server.start()
+
+        self._transport = Http2Transport(prior_knowledge=True)
+
+    def tearDown(self):
+        self._transport.close()
+        self._server.stop()
+
+    def test_returns_requests_response(self):
+        response = self._transport.request(
+            'POST',
+            f'{self._server.url}/items',
+            params=dict(page=2),
+            json=dict(key='value'),
+            headers={'X-Test': 'test'},
+            cookies=dict(cookie='value'))
+
+        self.assertIsInstance(response, Response)
+        self.assertTrue(b''.join(response.iter_content()).startswith(b'{'))
+        self.assertTrue(response.ok)
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        data = response.json()
+        self.assertEqual(data['method'], 'POST')
+        self.assertEqual(data['path'], '/items?page=2')
+        self.assertEqual(data['body'], '{"key":"value"}')
+        self.assertEqual(data['headers']['x-test'], 'test')
+        self.assertEqual(data['headers']['cookie'], 'cookie=value')
+        self.assertEqual(response.request.headers['X-Test'], 'test')
+
+    def test_multiplexes_requests(self):
+        for _ in range(3):
+            self._transport.request('GET', self._server.url)
+
+        self.assertEqual(self._server.connections, 1)
+        self.assertEqual(self._server.streams, [1, 3, 5])
+
+    def test_unsupported_params(self):
+        with self.assertRaises(RequestException):
+            self._transport.request('GET', self._server.url, cert='cert.pem')
+
+    def test_verify(self):
+        for verify in (None, False, True,):
+            response = self._transport.request(
+                'GET', self._server.url, verify=verify)
+            self.assertTrue(response.ok)
+
+        self.assertEqual(self._server.connections, 2)
+
+    def _get_plans(self, options):
+        return [
+            Plan._from_dict(dict(
+                path=f'{name}.yml',
+                options=options,
+                requests=[
+                    dict(get=dict(url=f'{self._server.url}/{name}/{i}'))
+                    for i in range(2)
+                ],
+            )) for name in 'abc'
+        ]
+
+    def test_plans_share_connection(self):
+        plans = self._get_plans(dict(http2_prior_knowledge=True))
+
+        runner = PlansRunner(plans, RequestLogger(), 3)
+        self.assertEqual(runner.run(), 0)
+
+        self.assertEqual(self._server.connections, 1)
+        self.assertEqual(len(self._server.streams), 6)
+
+    def test_closes_transports(self):
+        def get_plan(name, **options):
+            return Plan._from_dict(dict(
+                path=f'{name}.yml',
+                options=dict(http2_prior_knowledge=True, **options),
+                requests=[dict(get=dict(url=f'{self._server.url}/{name}'))],
+            ))
+
+        close = Http2Transport.close
+        with patch.object(
+                Http2Transport, 'close', autospec=True,
+                side_effect=close) as close_mock:
+            runner = PlansRunner(
+                [get_plan('a', session=True), get_plan('b', session=True)],
+                RequestLogger(),
+                2,
+                setup=get_plan('setup'),
+                teardown=get_plan('teardown'))
+            self.assertEqual(runner.run(), 0)
+
+        # Setup and teardown share a transport and each session has its own.
+        self.assertEqual(close_mock.call_count, 3)
+        self.assertEqual(self._server.connections, 3)
+
+    def test_negotiates_http2_with_tls(self):
+        # The server does not support HTTP/1.1, which is used for http://
+        # URLs without prior knowledge.
+        plans = self._get_plans(dict(http2=True))
+
+        runner = PlansRunner(plans, RequestLogger(), 3)
+        self.assertEqual(runner.run(), 3)
+        self.assertEqual(self._server.streams, [])
+
+
+class MockServer:
+    def __init__(self, headers=None):
+        self.requests = []
+        self._headers = headers or {'ETag': '"v1"'}
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.requests.append(dict(method=method, url=url, headers=headers))
+        if kwargs.get('json') is not None:
+            response = Response()
+            response.url = url
+            response.status_code = 201
+            response.elapsed = timedelta(milliseconds=2)
+            response._content = (
+                f'{len(self.requests)}:{kwargs["json"]}'.encode('utf-8'))
+            return response
+
+        response = Response()
+        response.url = url
+        response.elapsed = timedelta(milliseconds=1)
+        response.headers = CaseInsensitiveDict(self._headers)
+        headers = headers or {}
+        etag = self._headers.get('ETag')
+        modified = self._headers.get('Last-Modified')
+        if ((etag and headers.get('If-None-Match') == etag) or
+                (modified and headers.get('If-Modified-Since') == modified)):
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content = b'{"value": 1}'
+
+        return response
+
+
+class CachingTransportTest(TestCase):
+    def test_revalidates_cached_response(self):
+        server = MockServer()
+        transport = CachingTransport(server, HttpCache())
+
+        first = transport.request('GET', 'http://localhost:5000/data')
+        second = transport.request('GET', 'http://localhost:5000/data')
+        self.assertEqual(list(second.iter_lines()), [b'{"value": 1}'])
+
+        self.assertEqual(server.requests[0]['headers'], {})
+        self.assertEqual(
+            server.requests[1]['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.from_cache)
+
+    def test_conditional_request_bypasses_cache(self):
+        server = MockServer()
+        transport = CachingTransport(server, HttpCache())
+        url = 'http://localhost:5000/data'
+
+        transport.request('GET', url)
+        response = transport.request(
+            'GET', url, headers={'If-None-Match': '"v1"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(getattr(response, 'from_cache', False))
+        self.assertEqual(
+            server.requests[1]['headers'], {'If-None-Match': '"v1"'})
+
+    def test_persists_to_disk(self):
+        with TemporaryDirectory() as tmp:
+            server = MockServer(
+                {'Last-Modified': 'Mon, 19 Oct 2026 00:00:00 GMT'})
+            url = 'http://localhost:5000/data'
+
+            CachingTransport(server, HttpCache(tmp)).request('GET', url)
+            CachingTransport(server, HttpCache(tmp)).request('GET', url)
+
+            self.assertEqual(
+                server.requests[1]['headers'],
+                {'If-Modified-Since': 'Mon, 19 Oct 2026 00:00:00 GMT'})
+
+    def test_does_not_cache(self):
+        for method, headers in [
+            ('POST', None),
+            ('GET', {'ETag': '"v1"', 'Cache-Control': 'no-store'}),
+            ('GET', {'Content-Type': 'application/json'}),
+        ]:
+            with self.subTest(method=method, headers=headers):
+                server = MockServer(headers)
+                transport = CachingTransport(server, HttpCache())
+
+                for _ in range(2):
+                    response = transport.request(
+                        method, 'http://localhost:5000/data')
+                    self.assertEqual(response.status_code, 200)
+
+                self.assertFalse(server.requests[1]['headers'])
+
+
+class BlockingServer(MockServer):
+    def __init__(self, error=None):
+        super().__init__()
+        self.release = Event()
+        self._error = error
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.release.wait(5)
+        if self._error:
+            self.requests.append(dict(method=method, url=url))
+            raise self._error
+        return super().request(method, url, headers, **kwargs)
+
+
+class CoalescingTransportTest(TestCase):
+    def send_concurrently(self, server, requests, window=0):
+        coalescer = RequestCoalescer(window)
+        results = [None] * len(requests)
+
+        def send(i, method, url, kwargs):
+            transport = CoalescingTransport(server, coalescer)
+            try:
+                results[i] = transport.request(method, url, **kwargs)
+            except RequestException as error:
+                results[i] = error
+
+        threads = [
+            Thread(target=send, args=(i, *request,))
+            for i, request in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        # Give the threads time to join the in-flight request.
+        sleep(0.1)
+        server.release.set()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_shares_concurrent_requests(self):
+        server = BlockingServer()
+        url = 'http://localhost:5000/config'
+
+        results = self.send_concurrently(
+            server, [('GET', url, {})] * 4)
+
+        self.assertEqual(len(server.requests), 1)
+        for response in results:
+            self.assertIs(response, results[0])
+
+    def test_does_not_share_different_requests(self):
+        server = BlockingServer()
+        url = 'http://localhost:5000/config'
+
+        self.send_concurrently(server, [
+            ('GET', url, {}),
+            ('GET', url, dict(headers={'Accept': 'text/plain'})),
+            ('GET', url, dict(params={'page': 2})),
+            ('GET', url, dict(timeout=5)),
+            ('HEAD', url, {}),
+            ('POST', url, {}),
+            ('POST', url, {}),
+        ])
+
+        self.assertEqual(len(server.requests), 7)
+
+    def test_shares_errors(self):
+        server = BlockingServer(error=RequestException('timeout'))
+        url = 'http://localhost:5000/config'
+
+        results = self.send_concurrently(server, [('GET', url, {})] * 3)
+
+        self.assertEqual(len(server.requests), 1)
+        for error in results:
+            self.assertIsInstance(error, RequestException)
+
+    def test_window(self):
+        url = 'http://localhost:5000/config'
+
+        for window, n_requests in ((0, 2), (60, 1)):
+            with self.subTest(window=window):
+                server = MockServer()
+                transport = CoalescingTransport(
+                    server, RequestCoalescer(window))
+                transport.request('GET', url)
+                transport.request('GET', url)
+
+                self.assertEqual(len(server.requests), n_requests)
+
+
+class CassetteTest(TestCase):
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self._server = MockServer()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def record(self, requests):
+        recorder = CassetteRecorder(self._tmp.name)
+        transport = RecordingTransport(self._server, recorder)
+        for method, url, kwargs in requests:
+            transport.request(method, url, **kwargs)
+        recorder.save()
+
+    def replay(self, match=None):
+        args = [parse_match(match)] if match else []
+        return ReplayTransport(CassettePlayer(self._tmp.name, *args))
+
+    def test_replays_recorded_responses(self):
+        url = 'http://localhost:5000/items'
+        self.record([
+            ('GET', url, dict(headers={'X-Test': 'a'})),
+            ('POST', url, dict(json=dict(id=1))),
+            ('POST', url, dict(json=dict(id=1))),
+            ('POST', url, dict(json=dict(id=2))),
+        ])
+
+        transport = self.replay()
+        response = transport.request('GET', url)
+        self.assertEqual(list(response.iter_lines()), [b'{"value": 1}'])
+        self.assertEqual(response.json(), dict(value=1))
+        self.assertEqual(response.headers['ETag'], '"v1"')
+        self.assertEqual(response.elapsed, timedelta(milliseconds=1))
+
+        post = [transport.request('POST', url, json=dict(id=i)).text
+                for i in (2, 1, 1, 1)]
+        self.assertEqual(post, [
+            "4:{'id': 2}", "2:{'id': 1}", "3:{'id': 1}", "3:{'id': 1}"])
+
+        with self.assertRaises(RequestException):
+            transport.request('GET', f'{url}?page=2')
+        with self.assertRaises(RequestException):
+            transport.request('GET', url, params=dict(page=2))
+
+        self.assertEqual(len(self._server.requests), 4)
+
+    def test_match(self):
+        url = 'http://localhost:5000/items'
+        self.record([('GET', url, dict(headers={'X-Test': 'a'}))])
+
+        with self.assertRaises(RequestException):
+            self.replay('url,headers').request('GET', url)
+
+        response = self.replay('url').request(
+            'POST', url, params=dict(page=2))
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(ValueError):
+            parse_match('url,cookies')
+
+    def test_unsaved_recording_keeps_cassette(self):
+        url = 'http://localhost:5000/items'
+        self.record([('GET', url, {})])
+
+        recorder = CassetteRecorder(self._tmp.name)
+        RecordingTransport(self._server, recorder).request(
+            'POST', url, json=dict(id=1))
+
+        self.assertEqual(
+            self.replay().request('GET', url).json(), dict(value=1))
+
+    def test_save_multiple_times(self):
+        url = 'http://localhost:5000/items'
+        recorder = CassetteRecorder(self._tmp.name)
+        transport = RecordingTransport(self._server, recorder)
+
+        transport.request('GET', url)
+        recorder.save()
+        transport.request('POST', url, json=dict(id=1))
+        recorder.save()
+
+        replay = self.replay()
+        self.assertEqual(replay.request('GET', url).json(), dict(value=1))
+        self.assertEqual(
+            replay.request('POST', url, json=dict(id=1)).text,
+            "2:{'id': 1}")
+        self.assertEqual(
+            sorted(os.listdir(self._tmp.name)), ['data.bin', 'index.json'])
+
+    def test_truncated_data(self):
+        url = 'http://localhost:5000/items'
+        self.record([('GET', url, {})])
+        open(os.path.join(self._tmp.name, 'data.bin'), 'wb').close()
+
+        with self.assertRaisesRegex(RequestException, 'data.bin'):
+            self.replay().request('GET', url)
+
+    def test_replay_plan(self):
+        plan = Plan._from_dict(dict(
+            path='plan.yml',
+            requests=[
+                dict(get=dict(url='http://localhost:5000/data'),
+                     assertions=['response.json().value == 1']),
+            ],
+        ))
+
+        with patch('yaml_requests._transport.request', self._server.request):
+            runner = PlansRunner(
+                [plan], RequestLogger(),
+                record=CassetteRecorder(self._tmp.name))
+            self.assertEqual(runner.run(), 0)
+
+        runner = PlansRunner(
+            [plan], RequestLogger(),
+            replay=CassettePlayer(self._tmp.name))
+        self.assertEqual(runner.run(), 0)
+        self.assertEqual(len(self._server.requests), 1)
@@ -0,0 +1,174 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from yaml_requests._main import watch
+from yaml_requests._plan import build_plans
+from yaml_requests._watch import PlanWatcher
+from yaml_requests.error import InterruptedError
+from yaml_requests.logger import RequestLogger
+from yaml_requests.utils.args import load_plan_file
+
+
+PLAN = '''name: {name}
+variable_files:
+  - {variable_file}
+requests:
+  - get:
+      url: http://localhost:5000/{name}
+'''
+
+
+class PlanWatcherTest(TestCase):
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self._vars = os.path.join(self._tmp.name, 'vars.json')
+        self._plans = os.path.join(self._tmp.name, 'plans')
+        os.mkdir(self._plans)
+
+        self._write(self._vars, '{"key": "value"}')
+        self.write_plan('a', self._vars)
+        self.write_plan('b', os.path.join('..', 'vars.json'))
+        self.write_plan('c', None)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, filename, content):
+        with open(filename, 'w') as f:
+            f.write(content)
+
+    def write_plan(self, name, variable_file, content=PLAN):
+        if not variable_file:
+            content = content.replace(
+                'variable_files:\n  - {variable_file}\n', '')
+
+        filename = os.path.join(self._plans, f'{name}.yml')
+        self._write(filename, content.format(
+            name=name, variable_file=variable_file))
+        return filename
+
+    def poll(self, watcher):
+        return [os.path.basename(i) for i in watcher.poll()]
+
+    def test_poll(self):
+        watcher = PlanWatcher(self._plans)
+        filenames = watcher.poll()
+        self.assertEqual(
+            [os.path.basename(i) for i in filenames],
+            ['a.yml', 'b.yml', 'c.yml'])
+
+        plan_dicts, _ = watcher.load(filenames)
+        plans, _ = build_plans(plan_dicts, self._plans, {})
+        watcher.track(plans)
+        self.assertEqual(self.poll(watcher), [])
+
+        self._write(self._vars, '{"key": "changed"}')
+        self.assertEqual(self.poll(watcher), ['a.yml', 'b.yml'])
+
+        self.write_plan('c', None, PLAN + '  - get:\n      url: /c\n')
+        self.write_plan('d', None)
+        self.assertEqual(self.poll(watcher), ['c.yml', 'd.yml'])
+
+        os.remove(os.path.join(self._plans, 'a.yml'))
+        self._write(self._vars, '{"key": "removed value"}')
+        self.assertEqual(self.poll(watcher), ['b.yml'])
+
+    def test_load_uses_cache(self):
+        watcher = PlanWatcher(self._plans)
+        filenames = watcher.poll()
+
+        with patch('yaml_requests._watch.load_plan_file',
+                   wraps=load_plan_file) as load:
+            first, _ = watcher.load(filenames)
+            second, _ = watcher.load(filenames)
+
+            self.assertEqual(load.call_count, 3)
+            self.assertEqual(first, second)
+
+            self.write_plan('a', self._vars, PLAN + '# changed\n')
+            watcher.poll()
+            watcher.load(filenames)
+
+            self.assertEqual(load.call_count, 4)
+
+    def test_watch(self):
+        runs = []
+
+        class MockRunner:
+            def __init__(self, plans, *args, **kwargs):
+                self._plans = plans
+                self.transport = kwargs['transport']
+
+            def run(self):
+                runs.append(([i.name for i in self._plans], self.transport))
+
+        def change_files(_):
+            if len(runs) == 1:
+                self._write(self._vars, '{"key": "changed"}')
+            else:
+                raise KeyboardInterrupt()
+
+        with patch('yaml_requests._main.PlansRunner', MockRunner), \
+                patch('yaml_requests._main.sleep', side_effect=change_files):
+            with self.assertRaises(InterruptedError):
+                watch(self._plans, RequestLogger())
+
+        self.assertEqual(
+            [names for names, _ in runs], [['a', 'b', 'c'], ['a', 'b']])
+        self.assertIs(runs[0][1], runs[1][1])
+
+    def test_load_errors(self):
+        broken = os.path.join(self._plans, 'z_broken.yml')
+        self._write(broken, 'requests: [')
+
+        watcher = PlanWatcher(self._plans)
+        plan_dicts, invalid_plans = watcher.load(watcher.poll())
+        self.assertEqual(
+            [i['name'] for i in plan_dicts], ['a', 'b', 'c'])
+        self.assertEqual([i.path for i in invalid_plans], [broken])
+        self.assertIn('z_broken.yml', str(invalid_plans[0].error))
+
+        # The broken file is retried, but reported again only once changed.
+        self.assertEqual(self.poll(watcher), ['z_broken.yml'])
+        self.assertEqual(watcher.load([broken]), ([], []))
+
+        self._write(broken, 'requests: [[')
+        self.assertEqual(self.poll(watcher), ['z_broken.yml'])
+        self.assertEqual(len(watcher.load([broken])[1]), 1)
+
+        self.write_plan('z_broken', None)
+        plan_dicts, invalid_plans = watcher.load(watcher.poll())
+        self.assertEqual([i['name'] for i in plan_dicts], ['z_broken'])
+        self.assertEqual(invalid_plans, [])
+        self.assertEqual(self.poll(watcher), [])
+
+    def test_watch_with_broken_plan(self):
+        self._write(os.path.join(self._plans, 'z_broken.yml'), 'requests: [')
+        runs = []
+        logger = RequestLogger()
+
+        class MockRunner:
+            def __init__(self, plans, *args, **kwargs):
+                self._plans = plans
+
+            def run(self):
+                runs.append([i.name for i in self._plans])
+
+        def interrupt(_):
+            if logger.skipped_plan.call_count > 0:
+                raise KeyboardInterrupt()
+
+        with patch('yaml_requests._main.PlansRunner', MockRunner), \
+                patch('yaml_requests._main.sleep', side_effect=interrupt), \
+                patch.object(logger, 'skipped_plan') as skipped_plan:
+            with self.assertRaises(InterruptedError):
+                watch(self._plans, logger)
+
+        self.assertEqual(runs, [['a', 'b', 'c']])
+        plans, invalid_plans = skipped_plan.call_args.args
+        self.assertEqual(plans, [])
+        self.assertEqual(
+            [os.path.basename(i.path) for i in invalid_plans],
+            ['z_broken.yml'])
@@ -9,9 +9,10 @@
 from importlib.metadata import version
 __version__ = version('yaml_requests')
 
+from ._api import PlanResult, iter_results, run_plans, run_plans_async
 from ._main import execute, main, run
 from ._plan import Plan, PlanOptions
-from ._request import Assertion, Request
+from ._request import Assertion, Request, RequestResult
 
 
 # Hide dataclass constructors from documentation.
@@ -25,4 +26,10 @@ __all__ = [
     'PlanOptions',
     'Request',
     'Assertion',
+    'RequestResult',
+    'PlanResult',
+    'run_plans',
+    'run_plans_async',
+    'iter_results',
+    'tracing',
 ]
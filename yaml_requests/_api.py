@@ -0,0 +1,156 @@
+from asyncio import to_thread
+from copy import copy
+from queue import Queue
+from threading import Thread
+from typing import Iterable, Iterator, NamedTuple, Union
+
+from ._plan import Plan
+from ._request import RequestResult
+from ._runner import FAIL, PASS, PlansRunner
+from .error import InvalidPlanError
+from .logger import NullLogger
+
+
+class PlanResult(NamedTuple):
+    '''Compact summary of an executed plan.'''
+
+    plan: Plan
+    '''The executed plan.'''
+    state: str
+    '''State of the plan, one of `passed`, `failed`, or `skipped`.'''
+    duration: float
+    '''Time used for executing the plan in seconds.'''
+    requests: list[RequestResult]
+    '''Results of the executed requests in execution order. Requests of
+    repeated plans are included once for each iteration.'''
+
+    @property
+    def ok(self):
+        return self.state != 'failed'
+
+
+_STATES = {
+    PASS: 'passed',
+    FAIL: 'failed',
+}
+
+
+def _build_plans(plans, variables):
+    built = []
+    for plan in plans:
+        if isinstance(plan, Plan):
+            built.append(plan)
+            continue
+
+        try:
+            built.append(Plan._from_dict(plan, variables_override=variables))
+        except (ValueError, AssertionError,) as error:
+            raise InvalidPlanError(str(error))
+
+    return built
+
+
+def _create_runner(plans, variables, parallel, on_plan_result, kwargs):
+    plans = _build_plans(plans, variables)
+    # The runner reports results by plan object, so each position gets its
+    # own copy to keep a plan passed more than once apart.
+    runner_plans = [copy(plan) for plan in plans]
+    indexes = {id(plan): i for i, plan in enumerate(runner_plans)}
+    requests = [[] for _ in plans]
+
+    def on_result(plan, result):
+        i = indexes.get(id(plan))
+        if i is not None:
+            requests[i].append(result)
+
+    def on_plan(plan, n, duration, outcome):
+        i = indexes[id(plan)]
+        on_plan_result(PlanResult(
+            plan=plans[i],
+            state=_STATES.get(outcome, 'skipped'),
+            duration=duration,
+            requests=requests[i],
+        ))
+
+    return PlansRunner(
+        runner_plans,
+        NullLogger(),
+        parallel,
+        on_result=on_result,
+        on_plan_result=on_plan,
+        **kwargs)
+
+
+def run_plans(
+        plans: Iterable[Union[Plan, dict]],
+        variables: dict = None,
+        parallel: int = 1,
+        **kwargs) -> list[PlanResult]:
+    '''Run the plans without any console output and return the results of
+    the plans in the order they were finished.
+
+    `plans` can contain `Plan` objects and plan dicts in the same format as
+    the plan files. `variables` override the variables of the plan dicts.
+    Up to `parallel` plans are run at the same time.
+
+    Other keyword arguments, e.g. `transport`, `fail_fast`, `http_cache`,
+    and `tracer`, are passed to the runner. A `transport` is an object with a
+    `request` method that has the same signature and return value as
+    `requests.Session.request`.
+
+    Raises `yaml_requests.error.InvalidPlanError`, if a plan dict is invalid.
+    '''
+    results = []
+    runner = _create_runner(
+        plans, variables, parallel, results.append, kwargs)
+    runner.run()
+    return results
+
+
+async def run_plans_async(
+        plans: Iterable[Union[Plan, dict]],
+        variables: dict = None,
+        parallel: int = 1,
+        **kwargs) -> list[PlanResult]:
+    '''Like `run_plans`, but run the plans in a worker thread, so the event
+    loop is not blocked.'''
+    return await to_thread(
+        run_plans, plans, variables, parallel, **kwargs)
+
+
+_DONE = object()
+
+
+def iter_results(
+        plans: Iterable[Union[Plan, dict]],
+        variables: dict = None,
+        parallel: int = 1,
+        **kwargs) -> Iterator[PlanResult]:
+    '''Like `run_plans`, but yield the result of each plan as soon as the
+    plan is finished. The plans are run in a background thread. If the
+    iterator is closed before all results are consumed, the remaining plans
+    are skipped.'''
+    queue = Queue()
+    runner = _create_runner(plans, variables, parallel, queue.put, kwargs)
+
+    def run():
+        try:
+            runner.run()
+        except BaseException as error:
+            queue.put(error)
+        finally:
+            queue.put(_DONE)
+
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        runner.cancel()
+        thread.join()
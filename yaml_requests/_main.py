@@ -1,5 +1,6 @@
 from os import system
 import platform
+from time import sleep
 from traceback import print_exc
 
 from jinja2 import __version__ as _jinja2_version
@@ -7,10 +8,29 @@ from yaml import __version__ as _pyyaml_version
 from requests import __version__ as _requests_version
 
 from . import __version__
-from .utils.args import get_argparser, load_plan_files, parse_variables
+from .utils.args import (
+    get_argparser,
+    load_plan_file,
+    load_plan_files,
+    parse_variables,
+)
+from .utils.metrics import Metrics, MetricsServer
+from .utils.profile import PhaseTimer, Profiler
+from .utils.template import TemplateCache
 from .logger import ConsoleLogger
-from ._plan import build_plans
+from .tracing import FileExporter, HttpExporter, Tracer
+from ._plan import build_plans, load_matrix
 from ._runner import PlansRunner
+from ._transport import (
+    CassettePlayer,
+    CassetteRecorder,
+    DnsCache,
+    HttpCache,
+    PooledTransport,
+    RequestCoalescer,
+    parse_match,
+)
+from ._watch import PlanWatcher, POLL_INTERVAL
 from .error import (
     NoPlanError,
     InterruptedError,
@@ -31,6 +51,63 @@ def _print_versions():
         ')')
 
 
+def _get_options_override(args):
+    options_override = {}
+    if args.http2:
+        options_override['http2'] = True
+    if args.http2_prior_knowledge:
+        options_override['http2_prior_knowledge'] = True
+
+    return options_override
+
+
+def _get_http_cache(args):
+    if not args.http_cache and not args.http_cache_dir:
+        return None
+
+    return HttpCache(args.http_cache_dir)
+
+
+def _get_coalescer(args):
+    if not args.coalesce and args.coalesce_window is None:
+        return None
+
+    return RequestCoalescer(args.coalesce_window or 0)
+
+
+def _get_profiler(args):
+    if not (args.profile or args.profile_output or args.profile_collapsed):
+        return None
+
+    return Profiler(args.profile_output, args.profile_collapsed)
+
+
+def _get_cassettes(args):
+    if args.record and args.replay:
+        raise ValueError('Arguments --record and --replay cannot be combined.')
+
+    record = CassetteRecorder(args.record) if args.record else None
+    replay = None
+    if args.replay:
+        try:
+            replay = CassettePlayer(
+                args.replay, parse_match(args.replay_match))
+        except OSError as error:
+            raise ValueError(f'Failed to load recorded responses: {error}')
+
+    return record, replay
+
+
+def _get_tracer(args):
+    exporters = []
+    if args.trace_file:
+        exporters.append(FileExporter(args.trace_file))
+    if args.trace_endpoint:
+        exporters.append(HttpExporter(args.trace_endpoint))
+
+    return Tracer(*exporters) if exporters else None
+
+
 def main():
     '''Run the application.
 
@@ -48,20 +125,71 @@ def main():
         _print_versions()
         return 0
 
-    logger = ConsoleLogger(animations=args.animation, colors=args.colors)
+    logger = ConsoleLogger(
+        animations=args.animation,
+        colors=args.colors,
+        buffered=args.buffered,
+        quiet=args.quiet)
 
     try:
         variables_override = parse_variables(args.variables)
+        record, replay = _get_cassettes(args)
+        if (args.last_failed or args.resume) and not args.stats_file:
+            raise ValueError(
+                '--last-failed and --resume require --stats-file.')
     except ValueError as error:
         logger.error(str(error))
         return INVALID_PLAN
 
+    profiler = _get_profiler(args)
+    phase_timer = None
+    if args.profile_startup or profiler:
+        phase_timer = PhaseTimer()
+
+    metrics = None
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics = Metrics()
+        try:
+            metrics_server = MetricsServer(metrics, args.metrics_port)
+        except OSError as error:
+            logger.error(f'Failed to start metrics server: {error}')
+            return INVALID_PLAN
+        metrics_server.start()
+
+    if profiler:
+        profiler.start()
+
     try:
+        kwargs = dict(
+            parallel=args.parallel,
+            adaptive=args.adaptive,
+            setup=args.setup,
+            teardown=args.teardown,
+            stats_file=args.stats_file,
+            last_failed=args.last_failed,
+            resume=args.resume,
+            fail_fast=args.fail_fast,
+            options_override=_get_options_override(args),
+            http_cache=_get_http_cache(args),
+            coalescer=_get_coalescer(args),
+            preconnect=args.preconnect,
+            tracer=_get_tracer(args),
+            metrics=metrics,
+            record=record,
+            replay=replay,
+            template_cache=TemplateCache(args.template_cache_dir),
+            matrix=args.matrix)
+
+        if args.watch:
+            return watch(args.plan_file, logger, variables_override, **kwargs)
+
         num_errors = run(
             args.plan_file,
             logger,
             variables_override,
-            args.parallel)
+            phase_timer=phase_timer,
+            **kwargs)
         return min(num_errors, 250)
     except YamlRequestsError as error:
         logger.error(str(error))
@@ -71,6 +199,38 @@ def main():
         logger.error(UNKNOWN_ERROR_MSG)
         print_exc()
         return UNKNOWN_ERROR
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+
+        rows = phase_timer.rows if phase_timer else []
+        if profiler:
+            profiler.stop()
+            rows += profiler.rows
+
+        if rows:
+            logger.summary(rows)
+
+
+def _build_fixture(filename, variables_override, options_override):
+    '''Build the setup or teardown plan from the file.'''
+    if not filename:
+        return None
+
+    try:
+        plans, invalid_plans = build_plans(
+            [load_plan_file(filename)],
+            filename,
+            variables_override,
+            options_override)
+    except OSError as error:
+        raise InvalidPlanError(f'Failed to load plan {filename}: {error}')
+
+    if invalid_plans:
+        raise InvalidPlanError(
+            f'Invalid plan {filename}: {invalid_plans[0].error}')
+
+    return plans[0]
 
 
 def execute():
@@ -82,15 +242,49 @@ def execute():
     exit(code)
 
 
-def run(plan_path, logger, variables_override=None, parallel=None):
+def run(
+        plan_path,
+        logger,
+        variables_override=None,
+        parallel=None,
+        stats_file=None,
+        last_failed=False,
+        resume=False,
+        fail_fast=False,
+        options_override=None,
+        http_cache=None,
+        coalescer=None,
+        preconnect=False,
+        phase_timer=None,
+        adaptive=False,
+        setup=None,
+        teardown=None,
+        tracer=None,
+        metrics=None,
+        record=None,
+        replay=None,
+        template_cache=None,
+        matrix=None):
     try:
         if not plan_path:
             raise NoPlanError()
 
+        timer = phase_timer or PhaseTimer()
         try:
-            plan_dicts = load_plan_files(plan_path)
-            plans, invalid_plans = build_plans(
-                plan_dicts, plan_path, variables_override)
+            with timer.phase('Load plans'):
+                plan_dicts = load_plan_files(plan_path)
+                matrix = load_matrix(matrix) if matrix else None
+            with timer.phase('Build plans'):
+                plans, invalid_plans = build_plans(
+                    plan_dicts,
+                    plan_path,
+                    variables_override,
+                    options_override,
+                    matrix)
+                setup = _build_fixture(
+                    setup, variables_override, options_override)
+                teardown = _build_fixture(
+                    teardown, variables_override, options_override)
         except FileNotFoundError:
             raise NoPlanError(plan_path)
         except (ValueError, AssertionError,) as error:
@@ -100,8 +294,123 @@ def run(plan_path, logger, variables_override=None, parallel=None):
             logger.skipped_plan(plans, invalid_plans)
             raise InvalidPlanError('')
 
-        runner = PlansRunner(plans, logger, parallel)
-        return runner.run()
+        # Plans of the matrix send the same requests to the same hosts, so
+        # they share a connection pool.
+        transport = PooledTransport(DnsCache()) if matrix else None
+        runner = PlansRunner(
+            plans,
+            logger,
+            parallel,
+            stats_file=stats_file,
+            last_failed=last_failed,
+            resume=resume,
+            fail_fast=fail_fast,
+            http_cache=http_cache,
+            coalescer=coalescer,
+            preconnect=preconnect,
+            tracer=tracer,
+            metrics=metrics,
+            record=record,
+            replay=replay,
+            template_cache=template_cache,
+            adaptive=adaptive,
+            setup=setup,
+            teardown=teardown,
+            transport=transport)
+        try:
+            with timer.phase('Run plans'):
+                return runner.run()
+        finally:
+            if transport:
+                transport.close()
     except KeyboardInterrupt:
         logger.close()
         raise InterruptedError()
+
+
+def watch(
+        plan_path,
+        logger,
+        variables_override=None,
+        parallel=None,
+        options_override=None,
+        interval=POLL_INTERVAL,
+        **kwargs):
+    '''Run the plans and re-run the plans affected by changes in the plan
+    and variable files until interrupted. Plans that fail to load are
+    reported and re-run once they are changed again. The other plans are run
+    regardless of the failed plans.
+
+    Keyword arguments not listed here are passed to `PlansRunner`.
+    '''
+    if not plan_path:
+        raise NoPlanError()
+
+    watcher = PlanWatcher(plan_path)
+    transport = PooledTransport()
+    try:
+        while True:
+            filenames = watcher.poll()
+            if filenames:
+                _run_watched(
+                    watcher,
+                    filenames,
+                    plan_path,
+                    logger,
+                    variables_override,
+                    options_override,
+                    parallel=parallel,
+                    transport=transport,
+                    **kwargs)
+
+            sleep(interval)
+    except KeyboardInterrupt:
+        logger.close()
+        raise InterruptedError()
+    finally:
+        transport.close()
+
+
+def _run_watched(
+        watcher,
+        filenames,
+        plan_path,
+        logger,
+        variables_override,
+        options_override,
+        parallel=None,
+        setup=None,
+        teardown=None,
+        matrix=None,
+        **kwargs):
+    try:
+        plan_dicts, invalid_files = watcher.load(filenames)
+        plans, invalid_plans = build_plans(
+            plan_dicts,
+            plan_path,
+            variables_override,
+            options_override,
+            load_matrix(matrix) if matrix else None)
+        watcher.track(plans)
+
+        # Unlike in a single run, the valid plans are run, so that they are
+        # not left waiting for their next change.
+        invalid_plans = invalid_files + invalid_plans
+        if invalid_plans:
+            logger.skipped_plan([], invalid_plans)
+        if not plans:
+            return
+
+        setup = _build_fixture(setup, variables_override, options_override)
+        teardown = _build_fixture(
+            teardown, variables_override, options_override)
+
+        PlansRunner(
+            plans,
+            logger,
+            parallel,
+            setup=setup,
+            teardown=teardown,
+            **kwargs).run()
+    except (ValueError, AssertionError, YamlRequestsError,) as error:
+        logger.error(str(error))
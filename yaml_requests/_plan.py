@@ -9,8 +9,13 @@ from .error import (
     InvalidPlanError,
     LoadingPlanDependencyFailedError,
 )
-from ._request import Request
-from .utils.args import load_json_or_yaml_file
+from ._request import (
+    LOOP_FILE_FORMATS,
+    Request,
+    _open_text,
+    _read_loop_file,
+)
+from .utils.args import load_json_or_yaml_file, map_files
 
 
 @dataclass
@@ -25,6 +30,18 @@ class PlanOptions:
     '''Expression that determines if the plan should be repeated.'''
     repeat_delay: int = None
     '''Time to sleep in seconds before repeating the plan.'''
+    http2: bool = False
+    '''Send requests with HTTP/2, when supported by the server. HTTP/2 is
+    negotiated with TLS, so `http://` URLs are requested with HTTP/1.1, unless
+    `http2_prior_knowledge` is enabled. Requests from all plans that use
+    HTTP/2 are multiplexed over shared connections, unless `session` is
+    enabled.
+
+    Requires `httpx` with HTTP/2 support: `pip install yaml_requests[http2]`.
+    '''
+    http2_prior_knowledge: bool = False
+    '''Send requests with HTTP/2 without negotiating it, also to `http://`
+    URLs. The servers must support HTTP/2. Implies `http2`.'''
 
     @classmethod
     def _from_dict(cls, options_dict=None, options_override=None):
@@ -63,18 +80,31 @@ def _resolve_variable_files(variable_files, plan_path=None):
     return resolved
 
 
-def _load_variable_files(files):
+def _try_load_variable_file(filename):
+    try:
+        return load_json_or_yaml_file(filename), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _load_variable_files(files, loaded=None):
     variables = {}
 
     if not files:
         return variables
 
+    if loaded is None:
+        loaded = {}
+
     for f in files:
-        try:
-            data = load_json_or_yaml_file(f)
-        except Exception as e:
+        if f in loaded:
+            data, error = loaded[f]
+        else:
+            data, error = _try_load_variable_file(f)
+
+        if error is not None:
             raise LoadingPlanDependencyFailedError(
-                f'Failed to load variable file {f}: {str(e)}')
+                f'Failed to load variable file {f}: {error}')
         if not isinstance(data, dict):
             raise LoadingPlanDependencyFailedError(
                 f'Failed to load variable file {f}: '
@@ -113,13 +143,20 @@ class Plan:
     '''
     requests: list[Request]
     '''List of requests to be executed.'''
+    matrix_row: int = None
+    '''@private Number of the `--matrix` row the plan was built for.'''
+    matrix_variables: dict = None
+    '''@private Variables of the `--matrix` row.'''
 
     @classmethod
     def _from_dict(
             cls,
             input_dict,
             options_override=None,
-            variables_override=None):
+            variables_override=None,
+            loaded_variable_files=None,
+            matrix_row=None,
+            matrix_variables=None):
         if variables_override is None:
             variables_override = {}
 
@@ -130,8 +167,9 @@ class Plan:
             plan_dict.get('variable_files'), path)
         variables = {
             **plan_dict.get('variables', {}),
-            **_load_variable_files(variable_files),
-            **variables_override
+            **_load_variable_files(variable_files, loaded_variable_files),
+            **variables_override,
+            **(matrix_variables or {}),
         }
 
         requests = plan_dict.get('requests')
@@ -145,17 +183,25 @@ class Plan:
                 plan_dict.get('options'), options_override),
             variable_files=variable_files,
             variables=variables,
-            requests=requests
+            requests=requests,
+            matrix_row=matrix_row,
+            matrix_variables=matrix_variables,
         )
 
+    def _matrix_title(self):
+        values = ', '.join(
+            f'{key}={value}' for key, value in self.matrix_variables.items())
+        return f'Row {self.matrix_row}: {values}'
+
     def _title(self, display_filename=False):
-        if not display_filename:
-            return self.name
+        title = self.name
+        if display_filename and self.path:
+            title = f'{self.name} ({self.path})' if self.name else self.path
 
-        if self.name and self.path:
-            return f'{self.name} ({self.path})'
+        if self.matrix_row is not None:
+            return f'{title} [{self._matrix_title()}]'
 
-        return self.path or self.name
+        return title
 
 
 class InvalidPlan:
@@ -165,22 +211,76 @@ class InvalidPlan:
         self.error = error
 
 
+def _load_all_variable_files(plan_dicts):
+    '''Load variable files of all plans once. Returns a dict that maps
+    resolved filenames to `(data, error)` tuples.'''
+    filenames = []
+    for plan_dict in plan_dicts:
+        try:
+            filenames.extend(_resolve_variable_files(
+                plan_dict.get('variable_files'), plan_dict.get('path')))
+        except Exception:
+            # Errors are reported when building the plan.
+            continue
+
+    filenames = list(dict.fromkeys(filenames))
+    return dict(zip(filenames, map_files(_try_load_variable_file, filenames)))
+
+
+def load_matrix(filename):
+    '''Load variable sets from a CSV or JSON Lines file. Each row of the file
+    is a set of variables.'''
+    extension = filename[filename.rfind('.'):].lower()
+    file_format = LOOP_FILE_FORMATS.get(extension)
+    if not file_format:
+        raise AssertionError(
+            f'Failed to recognize format of matrix file {filename}. '
+            'Format must be csv or jsonl.')
+
+    try:
+        rows = list(_read_loop_file(_open_text(filename), file_format))
+    except OSError as error:
+        raise AssertionError(
+            f'Failed to load matrix file {filename}: {error}')
+
+    if not rows:
+        raise AssertionError(
+            f'Failed to load matrix file {filename}: The file has no rows.')
+
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise AssertionError(
+                f'Failed to load matrix file {filename}: Row {n} must be '
+                'an object.')
+
+    return rows
+
+
 def build_plans(
-    plan_dicts, paths, variables_override
+    plan_dicts, paths, variables_override, options_override=None, matrix=None
 ) -> tuple[list[Plan], list[InvalidPlan]]:
+    '''Build plans from the plan dicts. If `matrix` is defined, a plan is
+    built for each variable set of the matrix.'''
     plans = []
     invalid_plans = {}
 
     paths = ensure_list(paths)
+    loaded_variable_files = _load_all_variable_files(plan_dicts)
+    rows = list(enumerate(matrix, start=1)) if matrix else [(None, None)]
 
     for plan_dict in plan_dicts:
         plan_path = plan_dict['path']
 
         try:
-            plans.append(
-                Plan._from_dict(
-                    plan_dict,
-                    variables_override=variables_override))
+            for matrix_row, matrix_variables in rows:
+                plans.append(
+                    Plan._from_dict(
+                        plan_dict,
+                        options_override=options_override,
+                        variables_override=variables_override,
+                        loaded_variable_files=loaded_variable_files,
+                        matrix_row=matrix_row,
+                        matrix_variables=matrix_variables))
         except (ValueError, AssertionError,) as error:
             invalid_plans[path.realpath(plan_path)] = InvalidPlan(
                 plan_path,
@@ -0,0 +1,97 @@
+from multiprocessing.pool import ThreadPool
+from threading import Thread
+from urllib.parse import urlsplit
+
+from ._request import METHODS
+
+
+PRECONNECT_WORKERS = 8
+'''Maximum number of connections opened at the same time.'''
+
+
+def _request_url(request_dict):
+    if not isinstance(request_dict, dict):
+        return None
+
+    if request_dict.get('method'):
+        params = request_dict.get('params')
+    else:
+        params = next((
+            value for key, value in request_dict.items()
+            if key.upper() in METHODS), None)
+
+    if not isinstance(params, dict):
+        return None
+
+    url = params.get('url')
+    return url if isinstance(url, str) else None
+
+
+def _origin(url):
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+
+    if parts.scheme not in ('http', 'https',) or not parts.hostname:
+        return None
+
+    host = parts.hostname
+    if ':' in host:
+        # IPv6 address
+        host = f'[{host}]'
+
+    origin = f'{parts.scheme}://{host}'
+    return f'{origin}:{port}' if port else origin
+
+
+def plan_origins(plans, template_env):
+    '''Return the origins of the request URLs of the plans. URLs that are
+    templates are resolved with the variables of the plan. URLs that depend
+    on other values, e.g. responses, are ignored.'''
+    origins = {}
+    for plan in plans:
+        env = template_env.plan_overlay(plan.path)
+        try:
+            for name, value in env.resolve_templates(
+                    plan.variables).items():
+                env.register(name, value)
+        except Exception:
+            continue
+
+        for request_dict in plan.requests:
+            url = _request_url(request_dict)
+            if url is None:
+                continue
+
+            try:
+                url = env.resolve_templates(url)
+            except Exception:
+                continue
+
+            origin = _origin(url) if isinstance(url, str) else None
+            if origin:
+                origins[origin] = None
+
+    return list(origins)
+
+
+def _preconnect(transport, plans, template_env):
+    origins = plan_origins(plans, template_env)
+    if not origins:
+        return
+
+    pool = ThreadPool(min(len(origins), PRECONNECT_WORKERS))
+    pool.map(transport.preconnect, origins)
+    pool.close()
+
+
+def preconnect(transport, plans, template_env):
+    '''Open connections to the origins of the plans with `transport` in a
+    background thread. Returns the started thread.'''
+    thread = Thread(
+        target=_preconnect, args=(transport, plans, template_env,),
+        daemon=True)
+    thread.start()
+    return thread
@@ -1,8 +1,10 @@
-from copy import deepcopy
+import csv
 from dataclasses import dataclass
+from datetime import timedelta
+import json
 from jinja2.exceptions import TemplateError
 from requests.exceptions import RequestException
-from typing import Union
+from typing import Iterable, NamedTuple, Optional, Union
 from uuid import uuid4
 
 from ciou.types import ensure_list
@@ -21,6 +23,8 @@ METHOD_OR_PARAMS_MISSING = (
 
 
 class RequestState:
+    __slots__ = ('state', 'message',)
+
     SUCCESS = 'SUCCESS'
     NOT_RAISED = 'NOT-RAISED'
     FAILURE = 'FAILURE'
@@ -57,6 +61,34 @@ class RequestState:
         return self.state in (self.SUCCESS, self.NOT_RAISED, self.SKIPPED)
 
 
+class RequestResult(NamedTuple):
+    '''Compact, immutable summary of a finished request.'''
+
+    state: str
+    '''State of the request, one of the `RequestState` values.'''
+    status_code: Optional[int]
+    '''HTTP status code of the response or `None`, if no response was
+    received.'''
+    elapsed_ns: Optional[int]
+    '''Time elapsed between sending the request and receiving the response
+    in nanoseconds or `None`, if no response was received.'''
+    assertions: int
+    '''Bitmap of passed assertions: bit `i` is set if assertion `i`
+    passed.'''
+    n_assertions: int
+    '''Number of assertions defined for the request.'''
+
+    @property
+    def ok(self):
+        return self.state in (
+            RequestState.SUCCESS,
+            RequestState.NOT_RAISED,
+            RequestState.SKIPPED)
+
+    def assertion_ok(self, i):
+        return bool(self.assertions & (1 << i))
+
+
 @dataclass
 class Assertion:
     '''An assertion to execute after the request is sent. The assertion is
@@ -136,6 +168,26 @@ class Request:
     the key. See `method` for details.'''
     loop: str
     '''Loop over the given list of items.'''
+    loop_file: Union[str, dict]
+    '''Loop over the rows of a CSV or JSON Lines file. The current row is
+    available in `item` variable. CSV rows are dicts with the header row as
+    keys.
+
+    The rows are read one at a time while the requests are sent, so the file
+    is never loaded into memory as a whole. The file format is determined
+    from the file extension: `.csv` or `.jsonl`. To define the format
+    explicitly, use a dict with `path` and `format` keys:
+
+    ```yaml
+    - name: Create user {{ item.name }}
+      post:
+        url: http://localhost:8080/users
+        json:
+          name: "{{ item.name }}"
+      loop_file:
+        path: users.txt
+        format: csv
+    ```'''
     assertions: list[Union[Assertion, str]]
     '''List of assertions to execute after the request is sent.
 
@@ -159,8 +211,12 @@ class ParsedRequest(Request):
             request_dict: dict,
             template_env: Environment,
             skip=False,
-            context: dict = None):
-        self._raw = deepcopy(request_dict)
+            context: dict = None,
+            error: str = None):
+        # Only top-level keys are popped from the raw request, so a shallow
+        # copy is enough to keep the plan intact.
+        self._raw = dict(request_dict)
+        self._definition = request_dict
         self._processed = None
         self._template_env = template_env
         self.context = context
@@ -171,7 +227,9 @@ class ParsedRequest(Request):
 
         self._parse_assertions()
 
-        if skip:
+        if error:
+            self._set_state(RequestState.ERROR, error)
+        elif skip:
             self._set_state(RequestState.SKIPPED, EARLIER_ERRORS_SKIP)
         else:
             self._process_templates()
@@ -184,6 +242,34 @@ class ParsedRequest(Request):
     def _request(self):
         return self._processed or self._raw
 
+    @property
+    def title(self):
+        '''Name of the request or, if name is not defined, method and URL.'''
+        if self.name:
+            return self.name
+
+        params = getattr(self, 'params', None) or {}
+        return f'{getattr(self, "method", None)} {params.get("url")}'
+
+    @property
+    def label(self):
+        '''Name of the request or, if name is not defined, method and URL
+        without resolving templates. The label is the same for each
+        execution of the request, e.g. for each item of a loop.'''
+        definition = self._definition
+        if definition.get('name'):
+            return str(definition['name'])
+
+        method = definition.get('method')
+        params = definition.get('params')
+        if not method:
+            method, params = next((
+                (key, value,) for key, value in definition.items()
+                if key.upper() in METHODS), (None, None,))
+
+        url = params.get('url') if isinstance(params, dict) else None
+        return f'{str(method).upper() if method else None} {url}'
+
     def _set_state(self, state, message=None):
         self.state = RequestState(state, message)
 
@@ -233,6 +319,29 @@ class ParsedRequest(Request):
         self.assertions = [
             ParsedAssertion(raw_assertion) for raw_assertion in raw_assertions]
 
+    def result(self) -> RequestResult:
+        '''Return compact summary of the request. The summary does not hold
+        references to the request, response or template environment.'''
+        status_code = None
+        elapsed_ns = None
+        if self.response is not None:
+            status_code = self.response.status_code
+            elapsed_ns = (
+                self.response.elapsed // timedelta(microseconds=1) * 1000)
+
+        assertions = 0
+        for i, assertion in enumerate(self.assertions):
+            if assertion.executed and assertion.ok:
+                assertions |= 1 << i
+
+        return RequestResult(
+            state=self.state.state,
+            status_code=status_code,
+            elapsed_ns=elapsed_ns,
+            assertions=assertions,
+            n_assertions=len(self.assertions),
+        )
+
     def send(self, request_function):
         if self.state is not None:
             return
@@ -264,10 +373,78 @@ class ParsedRequest(Request):
                 self._set_state(RequestState.ERROR, message=str(error))
 
 
-def parse_request_loop(request_dict: dict,
-                       template_env: Environment) -> list[tuple[dict,
-                                                                Environment,
-                                                                dict]]:
+LOOP_FILE_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+
+def _open_text(filename):
+    return open(filename, 'r', newline='', encoding='utf-8')
+
+
+def _read_loop_file(f, file_format):
+    with f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+            return
+
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise AssertionError(
+                    f'Failed to parse line {n} of {f.name}: '
+                    f'{error}')
+
+
+def _parse_loop_file(request_dict, template_env):
+    raw_loop_file = template_env.resolve_templates(
+        request_dict.get('loop_file'))
+    if isinstance(raw_loop_file, dict):
+        filename = raw_loop_file.get('path')
+        file_format = raw_loop_file.get('format')
+    else:
+        filename, file_format = raw_loop_file, None
+
+    if not isinstance(filename, str):
+        raise AssertionError('Expected loop_file to define a path.')
+
+    if file_format is None:
+        extension = filename[filename.rfind('.'):].lower()
+        file_format = LOOP_FILE_FORMATS.get(extension)
+
+    if file_format not in LOOP_FILE_FORMATS.values():
+        raise AssertionError(
+            f'Failed to recognize format of loop_file {filename}. '
+            'Format must be csv or jsonl.')
+
+    f = template_env._find_file(filename, _open_text)
+    return ((request_dict, template_env, dict(item=item),)
+            for item in _read_loop_file(f, file_format))
+
+
+LOOP_ERRORS = (AssertionError, TemplateError, OSError, ValueError, csv.Error,)
+'''Errors raised when the items of a loop or a loop file can not be read.'''
+
+
+def parse_request_loop(
+        request_dict: dict,
+        template_env: Environment
+) -> Iterable[tuple[dict, Environment, dict]]:
+    '''Return the arguments for each `ParsedRequest` of the request. Items of
+    `loop_file` are read lazily while the returned iterable is consumed.'''
+    if request_dict.get('loop_file'):
+        if request_dict.get('loop'):
+            raise AssertionError(
+                'Request must not define both loop and loop_file.')
+
+        return _parse_loop_file(request_dict, template_env)
+
     raw_loop = request_dict.get('loop')
     if not raw_loop:
         return [(request_dict, template_env, None,)]
@@ -1,24 +1,66 @@
+from contextlib import nullcontext
 from datetime import datetime
 from io import StringIO
 from jinja2.exceptions import TemplateError
 from multiprocessing import cpu_count
-from multiprocessing.pool import ThreadPool
-from requests import request, Session
+from requests import Session
 from requests.cookies import cookiejar_from_dict
-from time import sleep
+from threading import Event
+from time import perf_counter
 
 from ciou.color import bold
 from ciou.progress import MessageStatus, Update
 from ciou.types import ensure_list
 
 from .error import LoadingPlanDependencyFailedError
-from .utils.template import Environment
-from ._request import ParsedRequest, parse_request_loop
+from .utils.concurrency import AdaptiveLimit
+from .utils.scheduler import Scheduler
+from .utils.stats import FAILED, PASSED, PlanStats, plan_key
+from .utils.template import Environment, FileCache
+from ._preconnect import preconnect
+from ._request import LOOP_ERRORS, ParsedRequest, parse_request_loop
+from .tracing import STATUS_ERROR, STATUS_OK
+from ._transport import (
+    CachingTransport,
+    CoalescingTransport,
+    DnsCache,
+    Http2Transport,
+    PooledTransport,
+    RecordingTransport,
+    ReplayTransport,
+    RequestsTransport,
+    TracingTransport,
+)
 
 
 PASS = 0
 FAIL = 1
 TOTAL = 2
+SKIPPED = 3
+
+SETUP_FAILED_SKIP = 'Plan skipped because the setup plan failed.'
+
+
+def _create_http2_transport(**kwargs):
+    try:
+        return Http2Transport(**kwargs)
+    except ImportError as e:
+        raise LoadingPlanDependencyFailedError(str(e))
+
+
+def _uses_http2(plan):
+    return plan.options.http2 or plan.options.http2_prior_knowledge
+
+
+def _request_loop(request_dict, template_env):
+    # If the items of the loop can not be read, e.g. because the loop file is
+    # missing or malformed, the loop ends with a request that fails with the
+    # error.
+    try:
+        for args in parse_request_loop(request_dict, template_env):
+            yield (*args, None,)
+    except LOOP_ERRORS as error:
+        yield request_dict, template_env, None, str(error)
 
 
 class ListCounter:
@@ -45,33 +87,146 @@ class ListCounter:
 
 
 class PlansRunner:
-    def __init__(self, plans, logger, parallel=None):
+    def __init__(
+            self,
+            plans,
+            logger,
+            parallel=None,
+            stats_file=None,
+            fail_fast=False,
+            on_result=None,
+            http_cache=None,
+            tracer=None,
+            metrics=None,
+            transport=None,
+            record=None,
+            replay=None,
+            template_cache=None,
+            adaptive=False,
+            setup=None,
+            teardown=None,
+            coalescer=None,
+            last_failed=False,
+            resume=False,
+            on_plan_result=None,
+            preconnect=False):
         self._plans = plans
         self._logger = logger
         self._parallel = min(len(self._plans),
                              parallel if parallel else cpu_count())
+        self._stats = PlanStats(stats_file)
+        self._fail_fast = fail_fast
+        self._cancel = Event()
+        self._cancel_reason = None
+        self._on_result = on_result
+        self._on_plan_result = on_plan_result
+        self._preconnect = preconnect
+        self._pooled_transport = None
+        self._http2 = {}
+        self._http_cache = http_cache
+        self._file_cache = FileCache()
+        self._template_env = Environment(
+            file_cache=self._file_cache, template_cache=template_cache)
+        self._tracer = tracer
+        self._metrics = metrics
+        self._transport = transport
+        self._record = record
+        self._replay = replay
+        self._adaptive = adaptive
+        self._setup = setup
+        self._teardown = teardown
+        self._coalescer = coalescer
+        self._last_failed = last_failed
+        self._resume = resume
+        self._scheduler = None
+        self._concurrency = None
+
+    def _open_transports(self):
+        if self._replay:
+            return
+
+        fixtures = [i for i in (self._setup, self._teardown,) if i]
+        for plan in ensure_list(self._plans) + fixtures:
+            prior_knowledge = plan.options.http2_prior_knowledge
+            if (_uses_http2(plan) and not plan.options.session and
+                    prior_knowledge not in self._http2):
+                self._http2[prior_knowledge] = _create_http2_transport(
+                    prior_knowledge=prior_knowledge)
+
+        if self._preconnect and not self._transport:
+            self._pooled_transport = PooledTransport(DnsCache())
+
+    def _start_preconnect(self, plans):
+        # Connections are opened while the first plans are already running.
+        transport = self._transport or self._pooled_transport
+        if (self._preconnect and not self._replay and
+                hasattr(transport, 'preconnect')):
+            preconnect(transport, plans, self._template_env)
+
+    def _close_transports(self):
+        for transport in self._http2.values():
+            transport.close()
+        self._http2 = {}
+
+        if self._pooled_transport:
+            self._pooled_transport.close()
+            self._pooled_transport = None
+
+    def _flush_traces(self):
+        if not self._tracer:
+            return
+
+        self._tracer.flush()
+        if self._tracer.error:
+            self._logger.error(
+                f'Failed to export traces: {self._tracer.error}')
 
     def run(self):
         n_requests = ListCounter(3)
-        n_plans = ListCounter(3)
+        n_plans = ListCounter(4)
 
         start = datetime.now()
 
-        plans = ensure_list(self._plans)
-        if self._parallel == 1:
-            results = map(self._run_single_series, plans)
-        else:
-            self._logger.start()
-            pool = ThreadPool(self._parallel)
-            results = pool.map(self._run_single_parallel, self._plans)
-            pool.close()
-            self._logger.close()
-
-        for n in results:
+        self._stats.start(self._resume)
+        plans = self._select_plans(ensure_list(self._plans))
+        self._open_transports()
+        self._start_preconnect(plans)
+        try:
+            # Plans are skipped, if the setup plan fails. The teardown plan is
+            # run regardless of the results.
+            if self._setup:
+                n = self._run_fixture(self._setup)
+                n_requests += n
+                if n[FAIL]:
+                    self._cancel_reason = SETUP_FAILED_SKIP
+                    self._cancel.set()
+
+            if min(self._parallel, len(plans)) <= 1:
+                results = list(map(self._run_single_series, plans))
+            else:
+                results = self._run_parallel(plans)
+
+            if self._teardown:
+                n_requests += self._run_fixture(self._teardown)
+        finally:
+            self._close_transports()
+            self._file_cache.close()
+            self._flush_traces()
+            if self._record:
+                self._record.save()
+
+        n_rows = {}
+        for plan, n, duration, outcome in results:
             n_requests += n
-            n_plans.increment(FAIL if n[FAIL] else PASS)
+            n_plans.increment(outcome)
             n_plans.increment(TOTAL)
 
+            if plan.matrix_row is not None:
+                n_row = n_rows.setdefault(
+                    plan.matrix_row, (plan, ListCounter(4),))[1]
+                n_row.increment(outcome)
+                n_row.increment(TOTAL)
+
         elapsed = (datetime.now() - start).total_seconds()
 
         summary = [
@@ -79,56 +234,234 @@ class PlansRunner:
             ('Requests', n_requests.data),
             ('Elapsed', f'{elapsed:.3f} s')
         ]
+        for _, (plan, n_row) in sorted(n_rows.items()):
+            summary.append((plan._matrix_title(), n_row.data))
+        if self._concurrency:
+            summary.append(('Parallel', self._concurrency.summary()))
         if n_plans[TOTAL] == 1:
             summary = summary[1:]
         self._logger.summary(summary)
+        self._stats.finish(complete=not n_plans[SKIPPED])
 
         return n_requests[FAIL]
 
+    def _select_plans(self, plans):
+        if self._resume:
+            plans = [i for i in plans if not self._stats.completed(i)]
+
+        if self._last_failed:
+            # Like pytest --last-failed, run all plans if none failed.
+            failed = [i for i in plans if self._stats.outcome(i) == FAILED]
+            plans = failed or plans
+
+        return plans
+
+    def _finish_plan(self, plan, n, duration, outcome):
+        # Results are saved after each plan, so they are available for
+        # --resume even if the run is interrupted.
+        if outcome != SKIPPED:
+            self._stats.record(
+                plan, duration, FAILED if outcome == FAIL else PASSED)
+            self._stats.save()
+
+        if self._on_plan_result:
+            self._on_plan_result(plan, n, duration, outcome)
+
+        return plan, n, duration, outcome
+
+    def _run_parallel(self, plans):
+        # Start the longest plans first and dispatch plans to workers one at
+        # a time to avoid idle workers at the end of the run. Iterations of
+        # repeated plans are dispatched separately, so plans waiting for
+        # repeat_delay do not occupy workers.
+        results = []
+        self._logger.start()
+        self._scheduler = Scheduler(self._parallel)
+        if self._adaptive:
+            self._concurrency = AdaptiveLimit(
+                self._parallel, on_change=self._scheduler.set_limit)
+            self._scheduler.set_limit(self._concurrency.limit)
+        try:
+            for plan in self._stats.longest_first(plans):
+                self._scheduler.submit(
+                    self._run_single_parallel, plan, results)
+            self._scheduler.join()
+        finally:
+            self._scheduler.close()
+            self._scheduler = None
+        self._logger.close()
+
+        return results
+
+    def cancel(self):
+        '''Skip the plans that have not been started and stop the running
+        plans before their next request.'''
+        self._cancel.set()
+        scheduler = self._scheduler
+        if scheduler:
+            scheduler.wake_all()
+
+    def _outcome(self, runner, n):
+        if n[FAIL]:
+            if self._fail_fast:
+                self.cancel()
+            return FAIL
+
+        if runner.cancelled:
+            return SKIPPED
+
+        return PASS
+
+    def _create_runner(self, plan, logger, *args, **kwargs):
+        kwargs.setdefault('cancel', self._cancel)
+        return PlanRunner(
+            plan,
+            logger,
+            *args,
+            on_result=self._on_result,
+            http2=self._http2.get(plan.options.http2_prior_knowledge),
+            http_cache=self._http_cache,
+            coalescer=self._coalescer,
+            template_env=self._template_env,
+            tracer=self._tracer,
+            metrics=self._metrics,
+            transport=self._transport or self._pooled_transport,
+            record=self._record,
+            replay=self._replay,
+            **kwargs)
+
+    def _run_fixture(self, plan):
+        '''Run setup or teardown plan. Variables registered by the plan are
+        registered to the shared template environment, so they are
+        available in the plans that are created after this.'''
+        runner = self._create_runner(plan, self._logger, True, cancel=Event())
+        n = runner.run()
+        for name, value in runner.registered.items():
+            self._template_env.register(name, value)
+
+        return n
+
     def _run_single_series(self, plan):
         display_filename = len(self._plans) > 1
-        runner = PlanRunner(plan, self._logger, display_filename)
-        return runner.run()
+        if self._cancel.is_set():
+            self._logger.cancelled_plan(
+                plan._title(display_filename), self._cancel_reason)
+            return self._finish_plan(plan, [0, 0, 0], 0, SKIPPED)
 
-    def _run_single_parallel(self, plan):
+        start = perf_counter()
+        runner = self._create_runner(plan, self._logger, display_filename)
+        n = runner.run()
+        outcome = self._outcome(runner, n)
+        return self._finish_plan(
+            plan, n, perf_counter() - start, outcome)
+
+    def _run_single_parallel(self, plan, results):
+        if self._cancel.is_set():
+            self._logger.push(Update(
+                key=plan_key(plan),
+                message=bold(plan._title(True)),
+                details=self._cancel_reason,
+                status=MessageStatus.SKIPPED,
+            ))
+            results.append(self._finish_plan(plan, [0, 0, 0], 0, SKIPPED))
+            return
+
+        start = perf_counter()
         out = StringIO()
         logger = self._logger.copy(target=out, log_started=False)
-        runner = PlanRunner(plan, logger, True, False)
+        runner = self._create_runner(
+            plan, logger, True, False, concurrency=self._concurrency)
 
         self._logger.push(Update(
-            key=plan.path,
+            key=plan_key(plan),
             message=bold(runner.title),
             status=MessageStatus.STARTED,
         ))
 
-        n = runner.run()
-        status = MessageStatus.ERROR if n[FAIL] else MessageStatus.SUCCESS
+        runner.start()
+        self._run_iteration_parallel(plan, runner, out, start, results)
+
+    def _run_iteration_parallel(self, plan, runner, out, start, results):
+        if runner.run_iteration():
+            self._scheduler.submit(
+                self._run_iteration_parallel,
+                plan,
+                runner,
+                out,
+                start,
+                results,
+                delay=runner.repeat_delay)
+            return
+
+        n = runner.finish()
+        outcome = self._outcome(runner, n)
+        status = {
+            PASS: MessageStatus.SUCCESS,
+            FAIL: MessageStatus.ERROR,
+            SKIPPED: MessageStatus.SKIPPED,
+        }[outcome]
         out.seek(0)
 
         self._logger.push(Update(
-            key=plan.path,
+            key=plan_key(plan),
             message=bold(runner.title),
             details=out.read(),
             status=status,
         ))
 
-        return n
+        results.append(self._finish_plan(
+            plan, n, perf_counter() - start, outcome))
 
 
 class PlanRunner:
-    def __init__(self, plan, logger, display_filename=False, print_name=True):
+    def __init__(
+            self,
+            plan,
+            logger,
+            display_filename=False,
+            print_name=True,
+            cancel=None,
+            on_result=None,
+            http2=None,
+            http_cache=None,
+            coalescer=None,
+            template_env=None,
+            tracer=None,
+            metrics=None,
+            transport=None,
+            record=None,
+            replay=None,
+            concurrency=None):
         self._plan = plan
         self._display_filename = display_filename
         self._print_name = print_name
-
-        self._env = Environment()
+        self._cancel = cancel or Event()
+        self._on_result = on_result
+        self._http2 = http2
+        self._http_cache = http_cache
+        self._coalescer = coalescer
+        self._tracer = tracer
+        self._metrics = metrics
+        self._default_transport = transport
+        self._record = record
+        self._replay = replay
+        self._concurrency = concurrency
+        self.cancelled = False
+
+        self._env = (template_env or Environment()).plan_overlay()
+        self._registered = set()
+        # Transport created for this plan only. It is closed when the plan
+        # is finished.
+        self._own_transport = None
         self._prepare_session()
+        self._prepare_transport()
 
         try:
             for name, value in self._env.resolve_templates(
                     self._plan.variables).items():
                 self._env.register(name, value)
         except TemplateError as e:
+            self._close_transport()
             raise LoadingPlanDependencyFailedError(
                 f'Failed to load plan variables: {str(e)}')
 
@@ -140,20 +473,62 @@ class PlanRunner:
             self._session = None
             return
 
-        self._session = Session()
-
+        headers = {}
+        cookies = {}
         if isinstance(session_option, dict):
             session_dict = self._env.resolve_templates(session_option)
-            self._session.headers.update(session_dict.get('headers', {}))
-            self._session.cookies.update(
-                cookiejar_from_dict(
-                    session_dict.get(
-                        'cookies', {})))
+            headers = session_dict.get('headers', {})
+            cookies = session_dict.get('cookies', {})
+
+        if _uses_http2(self._plan):
+            self._session = _create_http2_transport(
+                session=True,
+                headers=headers,
+                cookies=cookiejar_from_dict(cookies),
+                prior_knowledge=self._plan.options.http2_prior_knowledge)
+        else:
+            self._session = Session()
+            self._session.headers.update(headers)
+            self._session.cookies.update(cookiejar_from_dict(cookies))
+
+        self._own_transport = self._session
+
+    def _prepare_transport(self):
+        if self._replay:
+            transport = ReplayTransport(self._replay)
+        elif self._session:
+            transport = self._session
+        elif _uses_http2(self._plan):
+            transport = self._http2
+            if not transport:
+                transport = self._own_transport = _create_http2_transport(
+                    prior_knowledge=self._plan.options.http2_prior_knowledge)
+        else:
+            transport = self._default_transport or RequestsTransport()
+
+        if self._tracer:
+            transport = TracingTransport(transport, self._tracer)
+
+        if self._http_cache and not self._replay:
+            transport = CachingTransport(transport, self._http_cache)
+
+        # Headers and cookies of sessions are not visible to the coalescer,
+        # so requests sent within sessions are not shared.
+        if self._coalescer and not self._replay and not self._session:
+            transport = CoalescingTransport(transport, self._coalescer)
+
+        if self._record:
+            transport = RecordingTransport(transport, self._record)
+
+        self._transport = transport
+
+    def _close_transport(self):
+        if self._own_transport:
+            self._own_transport.close()
+            self._own_transport = None
 
     def _request(self, *args, **kwargs):
-        if self._plan.options.session:
-            return self._session.request(*args, **kwargs)
-        return request(*args, **kwargs)
+        return self._transport.request(*args, **kwargs)
 
     def _has_repeat_condition(self):
         return bool(self._plan.options.repeat_while)
@@ -165,60 +540,167 @@ class PlanRunner:
 
         return bool(repeat_while)
 
+    def _check_cancelled(self):
+        if self._cancel.is_set():
+            self.cancelled = True
+
+        return self.cancelled
+
     @property
     def title(self):
         return self._plan._title(self._display_filename)
 
-    def run(self):
-        n = ListCounter(3)
+    def _request_span(self):
+        if not self._tracer:
+            return nullcontext()
+
+        return self._tracer.span('request')
 
-        repeat_index = 0 if self._has_repeat_condition() else None
+    def _trace_request(self, span, request):
+        span.name = request.title
+        span.set_attribute('yaml_requests.request.state', str(request.state))
+        for key, value in (request.context or {}).items():
+            span.set_attribute(f'yaml_requests.request.context.{key}', value)
 
-        repeat_while = True
+        for assertion in request.assertions:
+            if assertion.executed:
+                span.add_event('assertion', {
+                    'yaml_requests.assertion.name': assertion.name,
+                    'yaml_requests.assertion.ok': assertion.ok,
+                })
 
+        if request.state.ok:
+            span.set_status(STATUS_OK)
+        else:
+            span.set_status(STATUS_ERROR, request.state.message)
+
+    @property
+    def registered(self):
+        '''Variables registered by the requests of the plan.'''
+        return {name: self._env.globals[name] for name in self._registered}
+
+    @property
+    def repeat_delay(self):
+        return self._plan.options.repeat_delay
+
+    def start(self):
+        '''Prepare for running the plan iteration by iteration with
+        `run_iteration`.'''
+        self._n = ListCounter(3)
+        self._repeat_index = 0 if self._has_repeat_condition() else None
+        self._span = None
+
+        if self._tracer:
+            attributes = {
+                'yaml_requests.plan.name': self._plan.name,
+                'yaml_requests.plan.path': self._plan.path,
+            }
+            name = self._plan.name or self._plan.path or 'plan'
+            self._span = self._tracer.start_span(name, attributes=attributes)
+
+    def run_iteration(self):
+        '''Run the requests of the plan once. Returns `True`, if the plan
+        should be repeated after `repeat_delay`.'''
+        if self._repeat_index and self._check_cancelled():
+            return False
+
+        if not self._span:
+            return self._run_iteration()
+
+        with self._tracer.activate(self._span):
+            try:
+                return self._run_iteration()
+            except BaseException:
+                self._span.end()
+                raise
+
+    def finish(self):
+        '''Return the number of passed, failed and total requests.'''
+        if self._span:
+            self._span.set_status(
+                STATUS_ERROR if self._n[FAIL] else STATUS_OK)
+            self._span.end()
+
+        self._close_transport()
+        return self._n.data
+
+    def run(self):
+        self.start()
+        try:
+            while self.run_iteration():
+                if self.repeat_delay:
+                    self._cancel.wait(self.repeat_delay)
+        except BaseException:
+            self._close_transport()
+            raise
+
+        return self.finish()
+
+    def _run_iteration(self):
+        n = self._n
+        repeat_index = self._repeat_index
         ignore_errors = self._plan.options.ignore_errors
 
-        while repeat_while:
-            if repeat_index:
-                if self._plan.options.repeat_delay:
-                    sleep(self._plan.options.repeat_delay)
+        self._env.register('repeat_index', repeat_index)
+        if self._metrics:
+            self._metrics.record_iteration(self._plan)
+        if self._span and repeat_index is not None:
+            self._span.add_event(
+                'repeat', {'yaml_requests.repeat_index': repeat_index})
+
+        self._logger.title(
+            self.title if self._print_name else None,
+            len(self._plan.requests),
+            repeat_index=repeat_index)
+
+        self._logger.start()
 
-            self._env.register('repeat_index', repeat_index)
-            self._logger.title(
-                self.title if self._print_name else None,
-                len(self._plan.requests),
-                repeat_index=repeat_index)
+        for request_dict in self._plan.requests:
+            if self._check_cancelled():
+                break
 
-            self._logger.start()
+            args_loop = _request_loop(request_dict, self._env)
+            for args in args_loop:
+                if self._check_cancelled():
+                    break
 
-            for request_dict in self._plan.requests:
-                args_loop = parse_request_loop(request_dict, self._env)
-                for args in args_loop:
-                    request_dict, template_env, context = args
-                    skip = not ignore_errors and n[FAIL] > 0
+                request_dict, template_env, context, error = args
+                skip = not ignore_errors and n[FAIL] > 0
+                with self._request_span() as span:
                     request = ParsedRequest(
-                        request_dict, template_env, skip, context)
+                        request_dict, template_env, skip, context, error)
 
                     if request.state is None:
                         self._logger.start_request(request)
                         request.send(self._request)
+                        if request.register and request.response is not None:
+                            self._registered.add(request.register)
+                        if self._concurrency:
+                            self._concurrency.record(request.response)
 
-                    self._logger.finish_request(request)
+                    if span:
+                        self._trace_request(span, request)
 
-                    if not request.state.ok:
-                        n.increment(FAIL)
-                    elif request.response is not None:
-                        n.increment(PASS)
-                    n.increment(TOTAL)
+                self._logger.finish_request(request)
+                if self._metrics:
+                    self._metrics.record_request(self._plan, request)
+                if self._on_result:
+                    self._on_result(self._plan, request.result())
 
-            self._logger.close()
+                if not request.state.ok:
+                    n.increment(FAIL)
+                elif request.response is not None:
+                    n.increment(PASS)
+                n.increment(TOTAL)
 
-            if not ignore_errors and n[FAIL] > 0:
-                break
+        self._logger.close()
+
+        if self.cancelled or (not ignore_errors and n[FAIL] > 0):
+            return False
 
-            repeat_while = self._check_repeat_condition()
+        repeat_while = self._check_repeat_condition()
 
-            if self._has_repeat_condition():
-                repeat_index += 1
+        if self._has_repeat_condition():
+            self._repeat_index += 1
 
-        return n.data
+        return repeat_while
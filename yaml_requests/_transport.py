@@ -0,0 +1,886 @@
+'''Transports used by `PlanRunner` to send requests.
+
+A transport is an object with a `request` method that has the same signature
+and return value as `requests.Session.request`.
+'''
+
+from datetime import timedelta
+from hashlib import sha256
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import json
+import mmap
+import os
+import shutil
+import socket
+import ssl
+from collections import deque
+from threading import Event, Lock
+from time import monotonic
+from urllib.parse import urlsplit
+
+from requests import PreparedRequest, Request, Response, Session, request
+from requests.adapters import HTTPAdapter
+from requests.cookies import cookiejar_from_dict
+from requests.exceptions import (
+    ConnectionError,
+    RequestException,
+    Timeout,
+)
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from .tracing import CLIENT, STATUS_ERROR
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+HTTP2_NOT_AVAILABLE = (
+    'HTTP/2 transport requires httpx with http2 support. Install it with '
+    '`pip install yaml_requests[http2]`.')
+
+
+class RequestsTransport:
+    '''Transport that sends each request with `requests.request`.'''
+
+    def request(self, method, url, **kwargs):
+        return request(method, url, **kwargs)
+
+
+class DnsCache:
+    '''Thread-safe cache of resolved addresses. The addresses are resolved
+    once per cache, so a cache should be used only for the duration of a
+    run.'''
+
+    def __init__(self):
+        self._addresses = {}
+        self._resolving = {}
+        self._lock = Lock()
+
+    def resolve(self, host, port):
+        '''Return the IP addresses of `host`. Raises `OSError`, if the host
+        can not be resolved.'''
+        key = (host, port,)
+        with self._lock:
+            addresses = self._addresses.get(key)
+            if addresses is not None:
+                return addresses
+            resolving = self._resolving.setdefault(key, Lock())
+
+        # Concurrent lookups of the same host wait for the first one.
+        with resolving:
+            with self._lock:
+                addresses = self._addresses.get(key)
+            if addresses is not None:
+                return addresses
+
+            addresses = list(dict.fromkeys(
+                info[4][0] for info in socket.getaddrinfo(
+                    host, port, type=socket.SOCK_STREAM)))
+            with self._lock:
+                self._addresses[key] = addresses
+                self._resolving.pop(key, None)
+            return addresses
+
+
+class _DnsCacheConnectionMixin:
+    dns_cache = None
+
+    def _new_conn(self):
+        # The socket is connected to the cached address. The host name is
+        # still used for TLS and the Host header.
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.resolve(host, self.port)
+        except OSError:
+            return super()._new_conn()
+
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError:
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+
+
+class _DnsCacheAdapter(HTTPAdapter):
+    def __init__(self, dns_cache, **kwargs):
+        attributes = dict(dns_cache=dns_cache)
+        http = type('HTTPConnection', (
+            _DnsCacheConnectionMixin, HTTPConnection,), attributes)
+        https = type('HTTPSConnection', (
+            _DnsCacheConnectionMixin, HTTPSConnection,), attributes)
+        self._pool_classes = dict(
+            http=type('HTTPConnectionPool', (
+                HTTPConnectionPool,), dict(ConnectionCls=http)),
+            https=type('HTTPSConnectionPool', (
+                HTTPSConnectionPool,), dict(ConnectionCls=https)),
+        )
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+
+class PooledTransport:
+    '''Transport that reuses connections between requests and plans.
+
+    Cookies from responses are not stored between requests. This allows
+    sharing the transport between plans.
+
+    If `dns_cache` is defined, host names are resolved only once.
+    '''
+
+    def __init__(self, dns_cache=None):
+        self._session = Session()
+        self._session.cookies.set_policy(
+            DefaultCookiePolicy(allowed_domains=[]))
+
+        if dns_cache:
+            for prefix in ('http://', 'https://',):
+                self._session.mount(prefix, _DnsCacheAdapter(dns_cache))
+
+    def request(self, method, url, **kwargs):
+        return self._session.request(method, url, **kwargs)
+
+    def _connection_pool(self, url):
+        # The pool is selected with the same settings as in `request`, so
+        # that the opened connection is found by the requests.
+        settings = self._session.merge_environment_settings(
+            url, {}, None, None, None)
+        if settings['proxies'].get(urlsplit(url).scheme):
+            return None
+
+        adapter = self._session.get_adapter(url)
+        if hasattr(adapter, 'get_connection_with_tls_context'):
+            return adapter.get_connection_with_tls_context(
+                Request('GET', url).prepare(),
+                settings['verify'],
+                cert=settings['cert'])
+
+        return adapter.get_connection(url)
+
+    def preconnect(self, url):
+        '''Open a connection to the origin of `url` and store it in the pool
+        used for sending requests to the origin. Connections through proxies
+        are not opened. Errors are ignored, as they are reported when the
+        requests are sent.'''
+        try:
+            pool = self._connection_pool(url)
+            if pool is None:
+                return
+            connection = pool._get_conn()
+        except Exception:
+            return
+
+        try:
+            connection.connect()
+        except Exception:
+            connection.close()
+        finally:
+            pool._put_conn(connection)
+
+    def close(self):
+        self._session.close()
+
+
+def _to_httpx_timeout(timeout):
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(None, connect=connect, read=read)
+
+    return httpx.Timeout(timeout)
+
+
+def _to_prepared_request(request):
+    prepared = PreparedRequest()
+    prepared.method = request.method
+    prepared.url = str(request.url)
+    prepared.headers = CaseInsensitiveDict(request.headers.items())
+    prepared.body = request.content
+    return prepared
+
+
+def _response_with_content(content):
+    # The body is already read, so it is marked consumed. Otherwise
+    # iter_content and iter_lines would try to stream it from `raw`.
+    response = Response()
+    response._content = content
+    response._content_consumed = True
+    return response
+
+
+def _to_requests_response(response):
+    converted = _response_with_content(response.content)
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.headers = CaseInsensitiveDict(response.headers.items())
+    converted.encoding = get_encoding_from_headers(converted.headers)
+    converted.url = str(response.url)
+    converted.elapsed = response.elapsed
+    converted.request = _to_prepared_request(response.request)
+    converted.cookies = cookiejar_from_dict(dict(response.cookies))
+    converted.history = [_to_requests_response(i) for i in response.history]
+    return converted
+
+
+def _to_httpx_verify(verify):
+    # httpx expects CA bundles as SSL contexts.
+    if not isinstance(verify, str):
+        return verify
+
+    if os.path.isdir(verify):
+        return ssl.create_default_context(capath=verify)
+
+    return ssl.create_default_context(cafile=verify)
+
+
+class Http2Transport:
+    '''Transport that sends requests with HTTP/2 over a shared pool of
+    multiplexed connections.
+
+    HTTP/2 is negotiated with TLS, so requests to `http://` URLs are sent with
+    HTTP/1.1. If `prior_knowledge` is enabled, HTTP/2 is used without
+    negotiation, which requires that all servers support HTTP/2.
+
+    Requests with different `verify` values are sent with separate
+    connection pools.
+
+    If `session` is falsy, cookies from responses are not stored between
+    requests. This allows sharing the transport between plans.
+    '''
+
+    UNSUPPORTED_PARAMS = ('proxies', 'cert',)
+
+    def __init__(
+            self,
+            session=False,
+            headers=None,
+            cookies=None,
+            prior_knowledge=False):
+        if httpx is None:
+            raise ImportError(HTTP2_NOT_AVAILABLE)
+
+        if not session:
+            cookies = CookieJar(DefaultCookiePolicy(allowed_domains=[]))
+
+        self._headers = headers
+        self._cookies = cookies if cookies is not None else CookieJar()
+        self._prior_knowledge = prior_knowledge
+        self._clients = {}
+        self._lock = Lock()
+
+    def _client(self, verify):
+        if verify is None:
+            verify = True
+
+        with self._lock:
+            client = self._clients.get(verify)
+            if client is None:
+                client = httpx.Client(
+                    http1=not self._prior_knowledge,
+                    http2=True,
+                    verify=_to_httpx_verify(verify),
+                    headers=self._headers,
+                    cookies=self._cookies,
+                    timeout=None)
+                self._clients[verify] = client
+
+            return client
+
+    def request(
+            self,
+            method,
+            url,
+            params=None,
+            data=None,
+            headers=None,
+            cookies=None,
+            files=None,
+            auth=None,
+            timeout=None,
+            allow_redirects=True,
+            json=None,
+            verify=None,
+            **kwargs):
+        for key in self.UNSUPPORTED_PARAMS:
+            if kwargs.get(key) is not None:
+                raise RequestException(
+                    f'Parameter {key} is not supported with HTTP/2 '
+                    'transport.')
+
+        if cookies:
+            cookie = '; '.join(f'{k}={v}' for k, v in cookies.items())
+            headers = {**(headers or {}), 'Cookie': cookie}
+
+        content = None
+        if data is not None and not isinstance(data, dict):
+            content, data = data, None
+
+        try:
+            response = self._client(verify).request(
+                method,
+                url,
+                params=params,
+                content=content,
+                data=data,
+                files=files,
+                json=json,
+                headers=headers,
+                auth=auth,
+                follow_redirects=allow_redirects,
+                timeout=_to_httpx_timeout(timeout),
+            )
+        except httpx.TimeoutException as error:
+            raise Timeout(str(error))
+        except httpx.TransportError as error:
+            raise ConnectionError(str(error))
+        except (httpx.HTTPError, httpx.InvalidURL) as error:
+            raise RequestException(str(error))
+
+        return _to_requests_response(response)
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+
+        for client in clients.values():
+            client.close()
+
+
+class CacheEntry:
+    __slots__ = ('status_code', 'reason', 'headers', 'url', 'content',)
+
+    VALIDATORS = ('ETag', 'Last-Modified',)
+    CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since',)
+
+    def __init__(self, status_code, reason, headers, url, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.url = url
+        self.content = content
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(
+            status_code=response.status_code,
+            reason=response.reason,
+            headers=dict(response.headers),
+            url=response.url,
+            content=response.content,
+        )
+
+    @property
+    def conditional_headers(self):
+        headers = CaseInsensitiveDict(self.headers)
+        conditional = {}
+        if headers.get('ETag'):
+            conditional['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            conditional['If-Modified-Since'] = headers['Last-Modified']
+        return conditional
+
+    def to_response(self, not_modified):
+        '''Build response from the cached entry and the 304 Not Modified
+        response received when revalidating the entry.'''
+        response = _response_with_content(self.content)
+        response.status_code = self.status_code
+        response.reason = self.reason
+        response.headers = CaseInsensitiveDict(
+            {**self.headers, **not_modified.headers})
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = self.url
+        response.elapsed = not_modified.elapsed
+        response.request = not_modified.request
+        response.cookies = not_modified.cookies
+        response.from_cache = True
+        return response
+
+
+class HttpCache:
+    '''Thread-safe store for responses that have validators. Entries are
+    stored in memory and, if `cache_dir` is defined, on disk.'''
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = cache_dir
+        self._entries = {}
+        self._lock = Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(method, url, params=None, headers=None):
+        data = json.dumps(
+            [method.upper(), url, params, headers],
+            sort_keys=True,
+            default=str)
+        return sha256(data.encode('utf-8')).hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self._cache_dir, f'{key}.{extension}')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key, 'json'), 'r') as f:
+                metadata = json.load(f)
+            with open(self._path(key, 'body'), 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+
+        return CacheEntry(content=content, **metadata)
+
+    def _write(self, path, mode, data):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, mode) as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _save(self, key, entry):
+        metadata = dict(
+            status_code=entry.status_code,
+            reason=entry.reason,
+            headers=entry.headers,
+            url=entry.url,
+        )
+        self._write(self._path(key, 'body'), 'wb', entry.content)
+        self._write(self._path(key, 'json'), 'w', json.dumps(metadata))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._cache_dir:
+                entry = self._load(key)
+                if entry is not None:
+                    self._entries[key] = entry
+
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            if self._cache_dir:
+                self._save(key, entry)
+
+
+def _is_cacheable(response):
+    cache_control = response.headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control:
+        return False
+
+    return response.status_code == 200 and any(
+        response.headers.get(i) for i in CacheEntry.VALIDATORS)
+
+
+class CachingTransport:
+    '''Transport that stores GET responses with `ETag` or `Last-Modified`
+    validators to `HttpCache` and revalidates them with conditional requests.
+    If the server responds with 304 Not Modified, the cached response is
+    returned.
+
+    Requests that already have conditional headers bypass the cache, so that
+    the response of the server is returned as is.'''
+
+    def __init__(self, transport, cache):
+        self._transport = transport
+        self._cache = cache
+
+    def request(self, method, url, **kwargs):
+        headers = kwargs.get('headers') or {}
+        if method.upper() != 'GET' or any(
+                i in CaseInsensitiveDict(headers)
+                for i in CacheEntry.CONDITIONAL_HEADERS):
+            return self._transport.request(method, url, **kwargs)
+
+        kwargs.pop('headers', None)
+        key = HttpCache.key(method, url, kwargs.get('params'), headers)
+
+        entry = self._cache.get(key)
+        if entry:
+            headers = {**entry.conditional_headers, **headers}
+
+        response = self._transport.request(
+            method, url, headers=headers, **kwargs)
+
+        if entry and response.status_code == 304:
+            return entry.to_response(response)
+
+        if _is_cacheable(response):
+            self._cache.set(key, CacheEntry.from_response(response))
+
+        return response
+
+
+class TracingTransport:
+    '''Transport that records each request as a client span of `tracer` and
+    propagates the span to the server with the `traceparent` header.'''
+
+    def __init__(self, transport, tracer):
+        self._transport = transport
+        self._tracer = tracer
+
+    def request(self, method, url, **kwargs):
+        attributes = {
+            'http.request.method': method.upper(),
+            'url.full': url,
+        }
+        with self._tracer.span(method.upper(), CLIENT, attributes) as span:
+            headers = kwargs.pop('headers', None) or {}
+            headers = {**headers, 'traceparent': span.traceparent}
+
+            response = self._transport.request(
+                method, url, headers=headers, **kwargs)
+
+            span.set_attribute(
+                'http.response.status_code', response.status_code)
+            if response.status_code >= 400:
+                span.set_status(STATUS_ERROR)
+
+            return response
+
+
+COALESCED_METHODS = ('GET', 'HEAD',)
+
+
+class _Call:
+    __slots__ = ('done', 'response', 'error', 'expires',)
+
+    def __init__(self):
+        self.done = Event()
+        self.response = None
+        self.error = None
+        self.expires = None
+
+
+class RequestCoalescer:
+    '''Thread-safe registry of in-flight requests shared by
+    `CoalescingTransport`s.
+
+    Responses of finished requests are shared for `window` seconds after the
+    response is received.
+    '''
+
+    def __init__(self, window=0):
+        self._window = window
+        self._calls = {}
+        self._expiring = deque()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(method, url, **kwargs):
+        '''Return key identifying the request or `None`, if the request can
+        not be shared.'''
+        if method.upper() not in COALESCED_METHODS:
+            return None
+        if kwargs.get('files') or kwargs.get('stream'):
+            return None
+        if (kwargs.get('data') is not None and
+                _body_hash(kwargs['data']) is None):
+            return None
+
+        fields = _request_fields(method, url, **kwargs)
+        for name in ('params', 'headers', 'data', 'json', 'files',):
+            kwargs.pop(name, None)
+        fields['options'] = _dumps(kwargs)
+        return _dumps(fields)
+
+    def _remove_expired(self, now):
+        while self._expiring and self._expiring[0][0] <= now:
+            _, key, call = self._expiring.popleft()
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _join(self, key):
+        '''Return the call for `key` and whether the caller should send the
+        request.'''
+        with self._lock:
+            now = monotonic()
+            self._remove_expired(now)
+
+            call = self._calls.get(key)
+            if call is not None and (
+                    call.expires is None or call.expires > now):
+                return call, False
+
+            call = _Call()
+            self._calls[key] = call
+            return call, True
+
+    def _finish(self, key, call):
+        with self._lock:
+            call.expires = monotonic() + self._window
+            if self._window:
+                self._expiring.append((call.expires, key, call,))
+            elif self._calls.get(key) is call:
+                del self._calls[key]
+
+        call.done.set()
+
+    def request(self, transport, method, url, **kwargs):
+        '''Send the request with `transport` or wait for the response of
+        an identical request.'''
+        key = self.key(method, url, **kwargs)
+        if key is None:
+            return transport.request(method, url, **kwargs)
+
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.response
+
+        try:
+            call.response = transport.request(method, url, **kwargs)
+            return call.response
+        except RequestException as error:
+            call.error = error
+            raise
+        except BaseException:
+            call.error = RequestException(
+                f'Shared request {method.upper()} {url} failed.')
+            raise
+        finally:
+            self._finish(key, call)
+
+
+class CoalescingTransport:
+    '''Transport that shares the response of a GET or HEAD request between
+    identical requests sent at the same time through `RequestCoalescer`.
+    Requests are identical, if their method, URL, parameters, headers, body,
+    and other options are equal.'''
+
+    def __init__(self, transport, coalescer):
+        self._transport = transport
+        self._coalescer = coalescer
+
+    def request(self, method, url, **kwargs):
+        return self._coalescer.request(
+            self._transport, method, url, **kwargs)
+
+
+CASSETTE_INDEX = 'index.json'
+CASSETTE_DATA = 'data.bin'
+
+MATCH_FIELDS = ('method', 'url', 'params', 'headers', 'body',)
+'''Request fields that can be used for matching recorded responses.'''
+DEFAULT_MATCH = ('method', 'url', 'params', 'body',)
+'''Request fields used for matching recorded responses by default.'''
+
+
+def _dumps(value):
+    if value is None:
+        return None
+
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _body_hash(data=None, json=None):
+    if json is not None:
+        body = _dumps(json)
+    elif isinstance(data, (dict, list)):
+        body = _dumps(data)
+    else:
+        body = data
+
+    if body is None:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if not isinstance(body, bytes):
+        # File objects and generators are not hashed.
+        return None
+
+    return sha256(body).hexdigest()
+
+
+def _request_fields(method, url, params=None, headers=None, data=None,
+                    json=None, **kwargs):
+    return dict(
+        method=method.upper(),
+        url=url,
+        params=_dumps(params or None),
+        headers=_dumps(headers or None),
+        body=_body_hash(data, json),
+    )
+
+
+def parse_match(value):
+    '''Parse comma separated list of request fields to match.'''
+    fields = tuple(i.strip() for i in value.split(',') if i.strip())
+    invalid = [i for i in fields if i not in MATCH_FIELDS]
+    if invalid or not fields:
+        raise ValueError(
+            f'Invalid replay match "{value}". Match must be a comma '
+            f'separated list of {", ".join(MATCH_FIELDS)}.')
+
+    return fields
+
+
+class CassetteRecorder:
+    '''Store responses to a cassette directory. Response bodies are appended
+    to a single data file and the metadata to an index. Both are written to
+    temporary files that replace the cassette in `save`, so an earlier
+    cassette is kept intact until then.'''
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, CASSETTE_INDEX)
+        self._data_path = os.path.join(directory, CASSETTE_DATA)
+        self._data_tmp = f'{self._data_path}.{os.getpid()}.tmp'
+        self._entries = []
+        self._size = 0
+        self._saved = False
+        self._writing = False
+        self._lock = Lock()
+
+    def _start_writing(self):
+        if self._saved:
+            # Continue from the saved data, e.g. in watch mode.
+            shutil.copyfile(self._data_path, self._data_tmp)
+        else:
+            open(self._data_tmp, 'wb').close()
+        self._writing = True
+
+    def record(self, request_fields, response):
+        content = response.content or b''
+        entry = dict(
+            request=request_fields,
+            status_code=response.status_code,
+            reason=response.reason,
+            headers=dict(response.headers),
+            url=response.url,
+            elapsed=response.elapsed.total_seconds(),
+            length=len(content),
+        )
+
+        with self._lock:
+            if not self._writing:
+                self._start_writing()
+
+            with open(self._data_tmp, 'ab') as f:
+                f.write(content)
+
+            entry['offset'] = self._size
+            self._size += len(content)
+            self._entries.append(entry)
+
+    def save(self):
+        with self._lock:
+            if self._saved and not self._writing:
+                return
+            if not self._writing:
+                self._start_writing()
+
+            tmp = f'{self._index_path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(self._data_tmp, self._data_path)
+            os.replace(tmp, self._index_path)
+            self._saved = True
+            self._writing = False
+
+
+class CassettePlayer:
+    '''Find recorded responses from a cassette directory.
+
+    Responses are indexed by the `match` fields of the request. If the same
+    request was recorded multiple times, the responses are returned in the
+    recorded order and the last response is repeated after that. Response
+    bodies are read from a memory map of the data file.
+    '''
+
+    def __init__(self, directory, match=DEFAULT_MATCH):
+        self._match = tuple(match)
+        self._index = {}
+        self._lock = Lock()
+
+        with open(os.path.join(directory, CASSETTE_INDEX), 'r') as f:
+            entries = json.load(f)
+
+        for entry in entries:
+            key = self._key(entry['request'])
+            self._index.setdefault(key, []).append(entry)
+
+        self._data = b''
+        with open(os.path.join(directory, CASSETTE_DATA), 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self._data = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _key(self, request_fields):
+        return tuple(request_fields.get(i) for i in self._match)
+
+    def find(self, request_fields):
+        '''Return the next recorded entry for the request or `None`.'''
+        with self._lock:
+            entries = self._index.get(self._key(request_fields))
+            if not entries:
+                return None
+
+            return entries.pop(0) if len(entries) > 1 else entries[0]
+
+    def to_response(self, entry):
+        offset = entry['offset']
+        end = offset + entry['length']
+        if end > len(self._data):
+            raise RequestException(
+                f'Recorded response for {entry["url"]} is missing from '
+                f'{CASSETTE_DATA}. Record the responses again.')
+
+        response = _response_with_content(
+            self._data[offset:end])
+        response.status_code = entry['status_code']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = entry['url']
+        response.elapsed = timedelta(seconds=entry['elapsed'])
+        return response
+
+
+class RecordingTransport:
+    '''Transport that stores the responses of `transport` with
+    `CassetteRecorder`.'''
+
+    def __init__(self, transport, recorder):
+        self._transport = transport
+        self._recorder = recorder
+
+    def request(self, method, url, **kwargs):
+        response = self._transport.request(method, url, **kwargs)
+        self._recorder.record(
+            _request_fields(method, url, **kwargs), response)
+        return response
+
+
+class ReplayTransport:
+    '''Transport that returns responses recorded with `RecordingTransport`
+    without sending any requests.'''
+
+    def __init__(self, player):
+        self._player = player
+
+    def request(self, method, url, **kwargs):
+        entry = self._player.find(_request_fields(method, url, **kwargs))
+        if entry is None:
+            raise RequestException(
+                f'No recorded response for {method.upper()} {url}.')
+
+        response = self._player.to_response(entry)
+        response.request = Request(
+            method, url, headers=kwargs.get('headers'),
+            params=kwargs.get('params')).prepare()
+        return response
@@ -0,0 +1,105 @@
+from os import path, stat
+
+from ._plan import InvalidPlan
+from .error import InvalidPlanError
+from .utils.args import find_plan_files, load_plan_file
+
+
+POLL_INTERVAL = 0.5
+'''Time in seconds between checking the plan and variable files for
+changes.'''
+
+
+def _stamp(filename):
+    try:
+        result = stat(filename)
+    except OSError:
+        return None
+
+    return (result.st_mtime_ns, result.st_size)
+
+
+class PlanWatcher:
+    '''Poll plan files and the variable files they depend on for changes.
+
+    Parsed plan files are cached, so plans that are affected only by changes
+    in their variable files are not parsed again.
+    '''
+
+    def __init__(self, plan_path):
+        self._plan_path = plan_path
+        self._stamps = {}
+        self._dependencies = {}
+        self._plan_dicts = {}
+        self._failed = {}
+
+    def _changed(self, filename):
+        key = path.realpath(filename)
+        stamp = _stamp(filename)
+        changed = self._stamps.get(key) != stamp
+        self._stamps[key] = stamp
+        return changed
+
+    def poll(self):
+        '''Return plan files that were added or changed, or that use variable
+        files that were changed, since the previous call.'''
+        filenames = find_plan_files(self._plan_path)
+        keys = {path.realpath(i) for i in filenames}
+
+        changed = {
+            path.realpath(i) for i in filenames if self._changed(i)}
+        for dependency in set().union(*self._dependencies.values()):
+            if dependency not in keys and self._changed(dependency):
+                changed.add(dependency)
+
+        for key in list(self._dependencies):
+            if key not in keys:
+                self._dependencies.pop(key)
+                self._plan_dicts.pop(key, None)
+                self._failed.pop(key, None)
+
+        return [
+            i for i in filenames
+            if path.realpath(i) in changed or
+            changed & self._dependencies.get(path.realpath(i), set())
+        ]
+
+    def load(self, filenames):
+        '''Load the plan files. Files that have not changed since they were
+        loaded previously are not parsed again.
+
+        Returns the loaded plan dicts and the files that failed to load as
+        `InvalidPlan` objects. Failed files are loaded again on the next
+        poll, but they are returned as invalid only once until they change.
+        '''
+        plan_dicts = []
+        invalid_plans = []
+        for filename in filenames:
+            key = path.realpath(filename)
+            stamp, plan_dict = self._plan_dicts.get(key, (None, None))
+            if stamp is None or stamp != self._stamps.get(key):
+                try:
+                    plan_dict = load_plan_file(filename)
+                except Exception as error:
+                    stamp = self._stamps.pop(key, None)
+                    if self._failed.get(key) != stamp:
+                        self._failed[key] = stamp
+                        invalid_plans.append(InvalidPlan(
+                            filename, None, InvalidPlanError(
+                                f'Failed to load plan {filename}: {error}')))
+                    continue
+
+                self._failed.pop(key, None)
+                self._plan_dicts[key] = (self._stamps.get(key), plan_dict)
+
+            plan_dicts.append(plan_dict)
+
+        return plan_dicts, invalid_plans
+
+    def track(self, plans):
+        '''Watch the variable files used by the plans.'''
+        for plan in plans:
+            dependencies = {path.realpath(i) for i in plan.variable_files}
+            self._dependencies[path.realpath(plan.path)] = dependencies
+            for dependency in dependencies:
+                self._stamps.setdefault(dependency, _stamp(dependency))
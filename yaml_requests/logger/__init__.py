@@ -1,2 +1,3 @@
 from ._console import ConsoleLogger
+from ._null import NullLogger
 from ._request import RequestLogger
@@ -1,13 +1,29 @@
+from dataclasses import replace
 import json
 import sys
+from threading import Lock, Timer
 import yaml
 
-from ciou.color import bold, colors, fg_green, fg_red, fg_hi_black, no_color
+from ciou.color import (
+    bold,
+    colors,
+    fg_green,
+    fg_hi_black,
+    fg_magenta,
+    fg_red,
+    no_color,
+)
 from ciou.progress import Checks, MessageStatus, Progress, OutputConfig, Update
 
 from .._request import RequestState
 
 
+BUFFER_SIZE = 100
+'''Maximum number of buffered entries before the buffer is flushed.'''
+BUFFER_INTERVAL = 0.5
+'''Maximum time in seconds to keep entries in the buffer.'''
+
+
 def get_assertion_status(assertion):
     if not assertion.executed:
         return MessageStatus.SKIPPED
@@ -36,11 +52,19 @@ class ConsoleLogger:
             animations=True,
             colors=True,
             target=None,
-            log_started=True):
+            log_started=True,
+            buffered=False,
+            quiet=False):
         if not target:
             target = sys.stdout
 
         self._log_started = log_started
+        self._buffered = buffered
+        self._quiet = quiet
+        self._pending_title = None
+        self._buffer = []
+        self._buffer_lock = Lock()
+        self._flush_timer = None
 
         self._output_config = OutputConfig(
             details_color=no_color,
@@ -55,10 +79,15 @@ class ConsoleLogger:
             animations=(not self._output_config.disable_animation),
             colors=(not self._output_config.disable_colors),
             target=self._output_config.target,
+            buffered=self._buffered,
+            quiet=self._quiet,
         )
         return ConsoleLogger(**{**current, **kwargs})
 
     def start(self):
+        if self._buffered:
+            return
+
         self._progress = Progress(config=self._output_config)
         self._progress.start()
 
@@ -69,9 +98,69 @@ class ConsoleLogger:
         return colors(*color)(text)
 
     def _print(self, *args):
+        if self._buffered:
+            return self._write(' '.join(str(i) for i in args) + '\n')
+
         return print(*args, file=self._output_config.target)
 
+    def _write(self, item):
+        with self._buffer_lock:
+            self._buffer.append(item)
+
+            if len(self._buffer) >= BUFFER_SIZE:
+                self._flush_buffer()
+            elif not self._flush_timer:
+                self._flush_timer = Timer(BUFFER_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _render_buffer(self, items):
+        # Render the updates with a single Checks instance per batch to
+        # avoid the rendering thread and animations of Progress.
+        config = replace(
+            self._output_config,
+            default_text_width=self._output_config.max_width)
+
+        text = []
+        checks = None
+        for item in items:
+            if isinstance(item, Update):
+                checks = checks or Checks(replace(config))
+                checks.push(item)
+                continue
+
+            if checks:
+                text.append(checks.getvalue())
+                checks = None
+            text.append(item)
+
+        if checks:
+            text.append(checks.getvalue())
+
+        return ''.join(text)
+
+    def _flush_buffer(self):
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if not self._buffer:
+            return
+
+        items, self._buffer = self._buffer, []
+        target = self._output_config.target
+        target.write(self._render_buffer(items))
+        target.flush()
+
+    def flush(self):
+        '''Write buffered output to the target.'''
+        with self._buffer_lock:
+            self._flush_buffer()
+
     def close(self):
+        if self._buffered:
+            return self.flush()
+
         if self._progress:
             self._progress.stop()
 
@@ -87,20 +176,38 @@ class ConsoleLogger:
         self._print(f'{error_text} {message}')
 
     def error(self, error):
-        return self._status(MessageStatus.ERROR, str(error))
+        self._status(MessageStatus.ERROR, str(error))
+        self.flush()
 
     def _repeat_text(self, repeat_index):
         if repeat_index is None:
             return ''
         return f' (repeat_index={repeat_index})'
 
-    def title(self, name, num_requests, repeat_index=None):
+    def _print_title(self, name, num_requests, repeat_index=None):
         name_text = f'{self._style(name, bold)}\n' if name else ''
         self._print(
             f'{name_text}Sending {num_requests} requests'
             f'{self._repeat_text(repeat_index)}:\n')
 
+    def title(self, name, num_requests, repeat_index=None):
+        if self._quiet:
+            # In quiet mode, the title is only printed before the first
+            # failed request.
+            self._pending_title = (name, num_requests, repeat_index)
+            return
+
+        self._print_title(name, num_requests, repeat_index)
+
     def push(self, update):
+        if self._quiet and update.status != MessageStatus.ERROR:
+            return
+
+        if self._buffered:
+            if update.status and update.status.finished:
+                self._write(update)
+            return
+
         return self._progress.push(update)
 
     def summary(self, rows):
@@ -108,7 +215,7 @@ class ConsoleLogger:
 
         for key, value in rows:
             if isinstance(value, list):
-                passed, failed, total = value
+                passed, failed, total, *skipped = value
                 values = []
 
                 if passed:
@@ -123,12 +230,20 @@ class ConsoleLogger:
                             f'{failed} failed',
                             bold,
                             fg_red))
+                if skipped and skipped[0]:
+                    values.append(
+                        self._style(
+                            f'{skipped[0]} skipped',
+                            bold,
+                            fg_magenta))
 
                 values.append(f'{total} total')
                 value = ', '.join(values)
             self._print(
                 f'{self._style((key + ":").ljust(key_width), bold)} {value}')
 
+        self.flush()
+
     def _get_name_text(self, request):
         if request.name:
             return self._style(request.name, bold)
@@ -257,7 +372,7 @@ yml, yaml]', '? ')
         return f'{message} ({", ".join(items)})'
 
     def start_request(self, request):
-        if not self._log_started:
+        if not self._log_started or self._buffered or self._quiet:
             return
 
         text = self._get_name_text(request) or self._get_method_text(request)
@@ -269,6 +384,14 @@ yml, yaml]', '? ')
         ))
 
     def finish_request(self, request):
+        if self._quiet:
+            if request.state.ok:
+                return
+
+            if self._pending_title:
+                self._print_title(*self._pending_title)
+                self._pending_title = None
+
         name_text = self._get_name_text(request)
         message = name_text or self._get_method_text(request)
 
@@ -283,7 +406,7 @@ yml, yaml]', '? ')
             f'{self._get_assertion_text(request)}'
             f'{self._response_text(request)}\n')
 
-        self._progress.push(Update(
+        self.push(Update(
             key=request.id,
             message=self._with_context(message, request.context),
             details=details,
@@ -306,3 +429,16 @@ yml, yaml]', '? ')
                 MessageStatus.SKIPPED,
                 'Plan skipped because parsing one or more plans failed.')
             self._print()
+
+        self.flush()
+
+    def cancelled_plan(self, title, reason=None):
+        if self._quiet:
+            return
+
+        if title:
+            self._print(self._style(title, bold))
+        self._status(
+            MessageStatus.SKIPPED,
+            reason or 'Plan skipped because an earlier plan failed.')
+        self._print()
@@ -0,0 +1,36 @@
+class NullLogger:
+    '''Logger that discards all output. Used when plans are run through the
+    library API.'''
+
+    def copy(self, **kwargs):
+        return self
+
+    def start(self):
+        pass
+
+    def error(self, error):
+        pass
+
+    def title(self, name, num_requests, repeat_index=None):
+        pass
+
+    def push(self, update):
+        pass
+
+    def summary(self, rows):
+        pass
+
+    def start_request(self, request):
+        pass
+
+    def close(self):
+        pass
+
+    def finish_request(self, request):
+        pass
+
+    def skipped_plan(self, plans, invalid_plans):
+        pass
+
+    def cancelled_plan(self, title, reason=None):
+        pass
@@ -35,3 +35,6 @@ class RequestLogger:
 
     def skipped_plan(self, plans, invalid_plans):
         pass
+
+    def cancelled_plan(self, title, reason=None):
+        pass
@@ -0,0 +1,239 @@
+'''Lightweight tracing for plans, requests and assertions.
+
+Spans are exported in [OTLP JSON](https://opentelemetry.io/docs/specs/otlp/)
+format with an exporter, for example, to a file with `FileExporter` or to a
+collector with `HttpExporter`:
+
+```python
+from yaml_requests import run
+from yaml_requests.logger import RequestLogger
+from yaml_requests.tracing import FileExporter, Tracer
+
+tracer = Tracer(FileExporter('traces.jsonl'))
+run('plan.yml', RequestLogger(), tracer=tracer)
+```
+'''
+
+from contextlib import contextmanager
+import json
+from os import urandom
+from threading import local, Lock
+from time import time_ns
+
+from requests import post
+
+
+INTERNAL = 1
+'''Span kind for spans that do not cross process boundaries.'''
+CLIENT = 3
+'''Span kind for outgoing requests.'''
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+BATCH_SIZE = 512
+'''Number of finished spans to collect before exporting them.'''
+
+
+def _to_otlp_value(value):
+    if isinstance(value, bool):
+        return dict(boolValue=value)
+    if isinstance(value, int):
+        return dict(intValue=str(value))
+    if isinstance(value, float):
+        return dict(doubleValue=value)
+    return dict(stringValue=str(value))
+
+
+def _to_otlp_attributes(attributes):
+    return [dict(key=key, value=_to_otlp_value(value))
+            for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    '''A timed operation within a trace.'''
+
+    def __init__(
+            self,
+            tracer,
+            name,
+            parent=None,
+            kind=INTERNAL,
+            attributes=None):
+        self._tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else urandom(16).hex()
+        self.span_id = urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = STATUS_UNSET
+        self.status_message = None
+        self.start_time = time_ns()
+        self.end_time = None
+
+    @property
+    def traceparent(self):
+        '''Value for W3C `traceparent` header.'''
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        self.events.append((name, time_ns(), dict(attributes or {})))
+
+    def set_status(self, status, message=None):
+        self.status = status
+        self.status_message = message
+
+    def end(self):
+        if self.end_time is None:
+            self.end_time = time_ns()
+            self._tracer._finish(self)
+
+    def to_otlp(self):
+        span = dict(
+            traceId=self.trace_id,
+            spanId=self.span_id,
+            name=self.name,
+            kind=self.kind,
+            startTimeUnixNano=str(self.start_time),
+            endTimeUnixNano=str(self.end_time),
+            attributes=_to_otlp_attributes(self.attributes),
+            events=[dict(
+                name=name,
+                timeUnixNano=str(time),
+                attributes=_to_otlp_attributes(attributes),
+            ) for name, time, attributes in self.events],
+            status=dict(code=self.status),
+        )
+
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+
+        return span
+
+
+class FileExporter:
+    '''Append exported spans to a file. Each export is written as a single
+    line of OTLP JSON.'''
+
+    def __init__(self, filename):
+        self._filename = filename
+
+    def export(self, data):
+        with open(self._filename, 'a') as f:
+            f.write(json.dumps(data, separators=(',', ':')) + '\n')
+
+
+class HttpExporter:
+    '''Send exported spans to an OTLP/HTTP endpoint, for example,
+    `http://localhost:4318/v1/traces`.'''
+
+    def __init__(self, endpoint, timeout=10):
+        self._endpoint = endpoint
+        self._timeout = timeout
+
+    def export(self, data):
+        post(self._endpoint, json=data, timeout=self._timeout
+             ).raise_for_status()
+
+
+class Tracer:
+    '''Create spans and export the finished spans with the given exporters.
+    An exporter must have an `export` method that takes OTLP JSON data as
+    a dict.
+
+    The current span is tracked per thread, so the same tracer can be used
+    from parallel plans. Failing exports do not interrupt the run, the latest
+    error is available in `error`.
+    '''
+
+    def __init__(self, *exporters, service_name='yaml_requests'):
+        self._exporters = exporters
+        self._service_name = service_name
+        self._finished = []
+        self._lock = Lock()
+        self._local = local()
+        self.error = None
+
+    @property
+    def current_span(self):
+        return getattr(self._local, 'span', None)
+
+    def start_span(self, name, kind=INTERNAL, attributes=None):
+        '''Start a span that is a child of the current span.'''
+        return Span(self, name, self.current_span, kind, attributes)
+
+    @contextmanager
+    def span(self, name, kind=INTERNAL, attributes=None):
+        '''Start a span and set it as the current span for the duration of
+        the context. Exceptions raised within the context set the span status
+        to error.'''
+        span = self.start_span(name, kind, attributes)
+        parent = self.current_span
+        self._local.span = span
+        try:
+            yield span
+        except BaseException as error:
+            span.set_status(STATUS_ERROR, str(error))
+            raise
+        finally:
+            self._local.span = parent
+            span.end()
+
+    @contextmanager
+    def activate(self, span):
+        '''Set an already started span as the current span for the duration
+        of the context. The span is not ended when the context exits.'''
+        parent = self.current_span
+        self._local.span = span
+        try:
+            yield span
+        except BaseException as error:
+            span.set_status(STATUS_ERROR, str(error))
+            raise
+        finally:
+            self._local.span = parent
+
+    def _finish(self, span):
+        with self._lock:
+            self._finished.append(span)
+            if len(self._finished) < BATCH_SIZE:
+                return
+
+            spans, self._finished = self._finished, []
+
+        self._export(spans)
+
+    def _export(self, spans):
+        from . import __version__
+
+        data = dict(resourceSpans=[dict(
+            resource=dict(attributes=_to_otlp_attributes({
+                'service.name': self._service_name,
+            })),
+            scopeSpans=[dict(
+                scope=dict(name='yaml_requests', version=__version__),
+                spans=[i.to_otlp() for i in spans],
+            )],
+        )])
+
+        for exporter in self._exporters:
+            try:
+                exporter.export(data)
+            except OSError as error:
+                self.error = error
+
+    def flush(self):
+        '''Export all finished spans.'''
+        with self._lock:
+            spans, self._finished = self._finished, []
+
+        if spans:
+            self._export(spans)
@@ -1,11 +1,22 @@
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
 import json
+from multiprocessing import cpu_count
 import os
 import yaml
 
 from ciou.types import ensure_list
 
 
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+'''YAML loader to use: libyaml based `CSafeLoader`, if available, or pure
+Python `SafeLoader`.'''
+PARALLEL_LOAD_MIN_BYTES = 1024 * 1024
+'''Minimum total size of files to parse in parallel processes. Smaller sets
+of files are parsed in the current process as starting the worker processes
+would take longer than parsing the files.'''
+
+
 def get_argparser():
     parser = ArgumentParser()
     parser.add_argument(
@@ -17,6 +28,103 @@ def get_argparser():
         '--parallel',
         type=int,
         help='Limit number of parallel executions.')
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help=(
+            'Start with one parallel execution and adjust the number of '
+            'parallel executions, up to the --parallel limit, based on '
+            'response times and overload errors (429, 503, timeouts).'))
+    parser.add_argument(
+        '--stats-file',
+        metavar='FILE',
+        help=(
+            'Record plan durations and outcomes to FILE and use the recorded '
+            'durations to start the slowest plans first when running plans in '
+            'parallel. The file is updated after each plan.'))
+    parser.add_argument(
+        '--matrix',
+        metavar='FILE',
+        help=(
+            'Run each plan once for each row of the CSV or JSON Lines FILE. '
+            'The values of the row are used as variables of the plan and '
+            'override variables defined with --variable.'))
+    parser.add_argument(
+        '--setup',
+        metavar='FILE',
+        help=(
+            'Run the plan in FILE once before the other plans. Variables '
+            'registered by its requests are available in all plans.'))
+    parser.add_argument(
+        '--teardown',
+        metavar='FILE',
+        help=(
+            'Run the plan in FILE once after the other plans, even if they '
+            'failed.'))
+    parser.add_argument(
+        '--last-failed',
+        action='store_true',
+        help=(
+            'Run only the plans that failed in the previous run recorded in '
+            '--stats-file. If no plans failed, all plans are run.'))
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help=(
+            'Continue the previous run recorded in --stats-file, if it was '
+            'interrupted, by skipping the plans completed in it.'))
+    parser.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help=(
+            'Stop executing plans after the first failed plan. Plans that '
+            'were not completed are reported as skipped.'))
+    parser.add_argument(
+        '--http2',
+        action='store_true',
+        help=(
+            'Send requests with HTTP/2, when supported by the server. '
+            'HTTP/2 is negotiated with TLS, so http:// URLs are requested '
+            'with HTTP/1.1. Overrides the http2 option of the plans.'))
+    parser.add_argument(
+        '--http2-prior-knowledge',
+        action='store_true',
+        help=(
+            'Send requests with HTTP/2 without negotiation, also to http:// '
+            'URLs. The servers must support HTTP/2. Overrides the '
+            'http2_prior_knowledge option of the plans.'))
+    parser.add_argument(
+        '--http-cache',
+        action='store_true',
+        help=(
+            'Cache GET responses with ETag or Last-Modified validators and '
+            'revalidate them with conditional requests.'))
+    parser.add_argument(
+        '--http-cache-dir',
+        metavar='DIR',
+        help=(
+            'Store cached responses to DIR to reuse them between runs. '
+            'Implies --http-cache.'))
+    parser.add_argument(
+        '--coalesce',
+        action='store_true',
+        help=(
+            'Share the response between identical GET and HEAD requests that '
+            'are sent at the same time by parallel plans.'))
+    parser.add_argument(
+        '--coalesce-window',
+        type=float,
+        metavar='SECONDS',
+        help=(
+            'Share responses also with identical requests sent within '
+            'SECONDS after the response was received. Implies --coalesce.'))
+    parser.add_argument(
+        '--preconnect',
+        action='store_true',
+        help=(
+            'Reuse connections between requests and plans, resolve each host '
+            'name once, and open connections to the hosts of the request '
+            'URLs in the background when the plans are started.'))
     parser.add_argument(
         '-v', '--variable',
         action='append',
@@ -30,11 +138,98 @@ def get_argparser():
         dest='animation',
         action='store_false',
         help='Disable progress animations in console output.')
+    parser.add_argument(
+        '--buffered',
+        action='store_true',
+        help=(
+            'Buffer console output and write it in batches. Progress '
+            'animations are not rendered in this mode.'))
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='Print only failed requests and the summary.')
     parser.add_argument(
         '--no-colors',
         dest='colors',
         action='store_false',
         help='Disable colors in console output.')
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help=(
+            'Print time used in each phase of the execution. Time used for '
+            'YAML parsing, templates, network and console output is '
+            'estimated by sampling stacks of all threads.'))
+    parser.add_argument(
+        '--profile-output',
+        metavar='FILE',
+        help=(
+            'Write cProfile statistics to FILE. Only the main thread is '
+            'profiled, use with --parallel 1 to include plan execution. '
+            'Implies --profile.'))
+    parser.add_argument(
+        '--profile-collapsed',
+        metavar='FILE',
+        help=(
+            'Write sampled stacks to FILE in collapsed stack format for '
+            'rendering flamegraphs. Implies --profile.'))
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help='Print time used for loading and parsing the plans.')
+    parser.add_argument(
+        '--trace-file',
+        metavar='FILE',
+        help=(
+            'Append spans of plans, requests and assertions to FILE in '
+            'OTLP JSON format. The trace context is sent to the servers '
+            'with the traceparent header.'))
+    parser.add_argument(
+        '--trace-endpoint',
+        metavar='URL',
+        help=(
+            'Send spans to OTLP/HTTP endpoint, for example, '
+            'http://localhost:4318/v1/traces.'))
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        metavar='PORT',
+        help=(
+            'Serve request counts, latencies, assertion failures and repeat '
+            'iterations in Prometheus text format from PORT while the plans '
+            'are running.'))
+    parser.add_argument(
+        '--template-cache-dir',
+        metavar='DIR',
+        help=(
+            'Store compiled templates and assertions to DIR to reuse them '
+            'between runs.'))
+    parser.add_argument(
+        '--record',
+        metavar='DIR',
+        help=(
+            'Record responses to DIR for replaying them later with '
+            '--replay. Existing recordings in DIR are overwritten.'))
+    parser.add_argument(
+        '--replay',
+        metavar='DIR',
+        help=(
+            'Return responses recorded with --record from DIR instead of '
+            'sending the requests.'))
+    parser.add_argument(
+        '--replay-match',
+        metavar='FIELDS',
+        default='method,url,params,body',
+        help=(
+            'Comma separated list of request fields used to find recorded '
+            'responses. Available fields are method, url, params, headers '
+            'and body. Defaults to method,url,params,body.'))
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help=(
+            'Keep running and re-run the plans affected by changes in the '
+            'plan and variable files. Stop with Ctrl+C.'))
     parser.add_argument(
         '--version',
         action='store_true',
@@ -51,8 +246,8 @@ def has_known_extension(path):
     return False
 
 
-def load_plan_files(paths, in_directory=False):
-    plans = []
+def find_plan_files(paths, in_directory=False):
+    files = []
 
     paths = ensure_list(paths)
     if in_directory:
@@ -60,12 +255,40 @@ def load_plan_files(paths, in_directory=False):
 
     for path in paths:
         if os.path.isdir(path):
-            plans.extend(load_plan_files((os.path.join(path, i)
+            files.extend(find_plan_files((os.path.join(path, i)
                          for i in os.listdir(path)), in_directory=True))
         elif has_known_extension(path) or not in_directory:
-            plans.append(load_plan_file(path))
+            files.append(path)
+
+    return files
+
+
+def _total_size(filenames):
+    total = 0
+    for filename in filenames:
+        try:
+            total += os.path.getsize(filename)
+        except (OSError, TypeError):
+            pass
+
+    return total
+
+
+def map_files(function, filenames):
+    '''Apply `function` to each of the `filenames`. Large sets of files are
+    processed in parallel processes.'''
+    filenames = list(filenames)
+    if (len(filenames) < 2 or
+            _total_size(filenames) < PARALLEL_LOAD_MIN_BYTES):
+        return list(map(function, filenames))
+
+    workers = min(len(filenames), cpu_count())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, filenames))
+
 
-    return plans
+def load_plan_files(paths):
+    return map_files(load_plan_file, find_plan_files(paths))
 
 
 def load_json_or_yaml_file(filename):
@@ -76,7 +299,7 @@ def load_json_or_yaml_file(filename):
         if filename.endswith('.json'):
             data = json.load(f)
         elif filename.endswith('.yaml') or filename.endswith('.yml'):
-            data = yaml.load(f, Loader=yaml.SafeLoader)
+            data = yaml.load(f, Loader=YAML_LOADER)
         else:
             raise ValueError(
                 'Failed to recognize file type. '
@@ -0,0 +1,107 @@
+from threading import Lock
+
+
+OVERLOAD_STATUS_CODES = (429, 503,)
+'''Response status codes that indicate that the server is overloaded.'''
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[round(percentile * (len(values) - 1))]
+
+
+class AdaptiveLimit:
+    '''Concurrency limit adjusted with additive increase and multiplicative
+    decrease (AIMD) based on the observed responses.
+
+    Responses are collected in windows of `window` responses. The limit is
+    increased by one after each window, unless the 95th percentile of the
+    response times in the window is more than `tolerance` times the lowest
+    95th percentile seen so far. The limit is multiplied by `backoff` when
+    the response times rise or when a request fails without a response or
+    with status 429 or 503. After a decrease, responses are ignored until the
+    requests started with the previous limit have finished, and the response
+    times are compared to the lowest 95th percentile seen after the
+    decrease. So a lasting change in the response times decreases the limit
+    only once.
+    '''
+
+    def __init__(
+            self,
+            maximum,
+            initial=1,
+            minimum=1,
+            window=20,
+            tolerance=2.0,
+            backoff=0.5,
+            on_change=None):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = max(minimum, min(initial, maximum))
+        self.lowest = self.limit
+        self.highest = self.limit
+        self._window = window
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._on_change = on_change
+        self._lock = Lock()
+        self._samples = []
+        self._baseline = None
+        self._cooldown = 0
+
+    def _set_limit(self, limit):
+        limit = max(self.minimum, min(limit, self.maximum))
+        self._samples = []
+        if limit == self.limit:
+            return False
+
+        self.limit = limit
+        self.lowest = min(self.lowest, limit)
+        self.highest = max(self.highest, limit)
+        return True
+
+    def _decrease(self):
+        self._cooldown = self.limit
+        self._baseline = None
+        return self._set_limit(int(self.limit * self._backoff))
+
+    def _observe(self, response):
+        if self._cooldown:
+            self._cooldown -= 1
+            if self._cooldown:
+                return False
+
+        if (response is None or
+                response.status_code in OVERLOAD_STATUS_CODES):
+            return self._decrease()
+
+        self._samples.append(response.elapsed.total_seconds())
+        if len(self._samples) < self._window:
+            return False
+
+        p95 = _percentile(self._samples, 0.95)
+        if self._baseline is None or p95 < self._baseline:
+            self._baseline = p95
+
+        if p95 > self._baseline * self._tolerance:
+            return self._decrease()
+
+        return self._set_limit(self.limit + 1)
+
+    def record(self, response):
+        '''Adjust the limit based on the response of a sent request. The
+        response is `None`, if the request failed without a response, e.g.
+        because of a timeout.'''
+        with self._lock:
+            changed = self._observe(response)
+            limit = self.limit
+
+        if changed and self._on_change:
+            self._on_change(limit)
+
+    def summary(self):
+        '''Return the final limit and the range of limits used.'''
+        if self.lowest == self.highest:
+            return str(self.limit)
+
+        return f'{self.limit} (min {self.lowest}, max {self.highest})'
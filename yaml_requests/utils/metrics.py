@@ -0,0 +1,216 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,)
+'''Upper bounds, in seconds, of the request duration histogram buckets.'''
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _labels_text(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_float(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    TYPE = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    @abstractmethod
+    def _render_value(self, label_values, value):
+        '''Return the exposition lines of the value of the labels.'''
+
+    def _header(self):
+        return [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} {self.TYPE}',
+        ]
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+
+        lines = self._header()
+        for label_values, value in values:
+            lines += self._render_value(label_values, value)
+        return lines
+
+
+class Counter(_Metric):
+    '''Monotonically increasing value for each combination of labels.'''
+
+    TYPE = 'counter'
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = (
+                self._values.get(label_values, 0) + amount)
+
+    def value(self, label_values=()):
+        return self._values.get(label_values, 0)
+
+    def _render_value(self, label_values, value):
+        labels = _labels_text(self.labels, label_values)
+        return [f'{self.name}{labels} {_format_float(value)}']
+
+
+class Histogram(_Metric):
+    '''Count of observations in cumulative buckets for each combination of
+    labels. Only the bucket counts, the sum and the count are stored, so the
+    memory usage does not grow with the number of observations.'''
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, label_values, value):
+        i = bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = (
+                    [0] * len(self.buckets) + [0.0])
+
+            counts[i] += 1
+            counts[-1] += value
+
+    def _render_value(self, label_values, value):
+        *counts, total = value
+        lines = []
+
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            labels = _labels_text(
+                self.labels, label_values, [('le', _format_float(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+
+        labels = _labels_text(self.labels, label_values)
+        lines.append(f'{self.name}_sum{labels} {_format_float(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def _plan_label(plan):
+    return plan.name or plan.path or ''
+
+
+class Metrics:
+    '''Request metrics of the plans updated in place by `PlanRunner`.
+
+    Requests are labeled by their unresolved name or method and URL, so the
+    number of series does not grow with loops and templated URLs.
+    '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.requests = Counter(
+            'yaml_requests_requests_total',
+            'Number of finished requests.',
+            ('plan', 'request', 'state',))
+        self.duration = Histogram(
+            'yaml_requests_request_duration_seconds',
+            'Time between sending the request and receiving the response.',
+            ('plan', 'request',),
+            buckets)
+        self.assertion_failures = Counter(
+            'yaml_requests_assertion_failures_total',
+            'Number of failed assertions.',
+            ('plan', 'request', 'assertion',))
+        self.repeat_iterations = Counter(
+            'yaml_requests_repeat_iterations_total',
+            'Number of started plan iterations.',
+            ('plan',))
+
+    def record_iteration(self, plan):
+        self.repeat_iterations.inc((_plan_label(plan),))
+
+    def record_request(self, plan, request):
+        plan_label = _plan_label(plan)
+        request_label = request.label
+
+        self.requests.inc(
+            (plan_label, request_label, str(request.state).lower(),))
+
+        if request.response is not None:
+            self.duration.observe(
+                (plan_label, request_label,),
+                request.response.elapsed.total_seconds())
+
+        for assertion in request.assertions:
+            if assertion.executed and not assertion.ok:
+                self.assertion_failures.inc(
+                    (plan_label, request_label, assertion.name,))
+
+    def render(self):
+        '''Return the metrics in Prometheus text exposition format.'''
+        lines = []
+        for metric in (
+                self.requests,
+                self.duration,
+                self.assertion_failures,
+                self.repeat_iterations,):
+            lines += metric.render()
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    '''Serve metrics from a background thread for Prometheus to scrape.'''
+
+    def __init__(self, metrics, port, host=''):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,163 @@
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+import sys
+from threading import Event, Thread, enumerate as enumerate_threads
+from time import perf_counter
+
+
+SAMPLE_INTERVAL = 0.005
+'''Interval in seconds between stack samples.'''
+
+SAMPLED_PHASES = (
+    ('YAML parsing', ('yaml',)),
+    ('Template compilation', ('jinja2.compiler', 'jinja2.lexer',
+                              'jinja2.parser',)),
+    ('Template rendering', ('jinja2',)),
+    ('Network', ('requests', 'urllib3', 'httpx', 'httpcore', 'h2',
+                 'http.client', 'socket', 'ssl',)),
+    ('Console output', ('yaml_requests.logger', 'ciou',)),
+)
+'''Phases used to attribute stack samples. Each phase is defined by module
+prefixes. A sample is attributed to the phase of its innermost matching
+frame.'''
+IDLE_FRAMES = (
+    ('threading', 'wait'),
+    ('queue', 'get'),
+)
+'''Innermost frames of threads that are waiting for work. These samples are
+not attributed to any phase.'''
+
+
+def _matches(module, prefixes):
+    return any(module == i or module.startswith(f'{i}.') for i in prefixes)
+
+
+def _get_phase(stack):
+    if stack[-1] in IDLE_FRAMES:
+        return None
+
+    for module, _ in reversed(stack):
+        for phase, prefixes in SAMPLED_PHASES:
+            if _matches(module, prefixes):
+                return phase
+
+    return None
+
+
+class PhaseTimer:
+    '''Measure time spent in named phases of the execution.'''
+
+    def __init__(self):
+        self._phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, perf_counter() - start))
+
+    @property
+    def phases(self):
+        return list(self._phases)
+
+    @property
+    def rows(self):
+        return [(name, f'{elapsed:.3f} s') for name, elapsed in self._phases]
+
+
+class StackSampler:
+    '''Sample stacks of all threads periodically on a background thread.'''
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self._interval = interval
+        self._stacks = Counter()
+        self._stop = Event()
+        self._thread = None
+
+    def _sample(self):
+        names = {i.ident: i.name for i in enumerate_threads()}
+        own = self._thread.ident
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+
+            stack = []
+            while frame is not None:
+                module = frame.f_globals.get('__name__', '?')
+                stack.append((module, frame.f_code.co_name))
+                frame = frame.f_back
+
+            stack.append((names.get(ident, 'Thread'), ''))
+            self._stacks[tuple(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self._sample()
+
+    def start(self):
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def phases(self):
+        '''Return estimated time spent in each of the `SAMPLED_PHASES`.'''
+        counts = Counter()
+        for stack, count in self._stacks.items():
+            phase = _get_phase(stack)
+            if phase:
+                counts[phase] += count
+
+        return [(phase, counts[phase] * self._interval)
+                for phase, _ in SAMPLED_PHASES if counts[phase]]
+
+    def write_collapsed(self, filename):
+        '''Write samples in collapsed stack format that can be rendered as a
+        flamegraph, for example, with `flamegraph.pl` or speedscope.'''
+        with open(filename, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                frames = ';'.join(
+                    f'{module}:{name}' if name else module
+                    for module, name in stack)
+                f.write(f'{frames} {count}\n')
+
+
+class Profiler:
+    '''Profile the execution by sampling stacks of all threads and,
+    optionally, with `cProfile`.
+
+    `cProfile` only profiles the thread that started the profiler. Use
+    `--parallel 1` to include the plan execution in the `cProfile` output.
+    '''
+
+    def __init__(self, stats_file=None, collapsed_file=None):
+        self._stats_file = stats_file
+        self._collapsed_file = collapsed_file
+        self._sampler = StackSampler()
+        self._cprofile = cProfile.Profile() if stats_file else None
+
+    def start(self):
+        self._sampler.start()
+        if self._cprofile:
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._cprofile:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._stats_file)
+
+        self._sampler.stop()
+        if self._collapsed_file:
+            self._sampler.write_collapsed(self._collapsed_file)
+
+    @property
+    def rows(self):
+        return [(f'{phase} (sampled)', f'{elapsed:.3f} s')
+                for phase, elapsed in self._sampler.phases]
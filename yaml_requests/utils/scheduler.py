@@ -0,0 +1,123 @@
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from multiprocessing.pool import ThreadPool
+from threading import Condition, Thread
+from time import monotonic
+
+
+class Scheduler:
+    '''Run tasks in a pool of worker threads. Delayed tasks wait in a timer
+    queue instead of a worker, so the workers are only occupied by tasks that
+    are running.
+
+    Tasks can submit new tasks. `join` waits until all submitted tasks,
+    including the delayed ones, have finished.
+
+    At most `limit` tasks are run at the same time. The limit can be changed
+    with `set_limit` while tasks are running, but it can not exceed the
+    number of workers.
+    '''
+
+    def __init__(self, workers, limit=None):
+        self._pool = ThreadPool(workers)
+        self._workers = workers
+        self._limit = min(limit or workers, workers)
+        self._condition = Condition()
+        self._ready = deque()
+        self._running = 0
+        self._timers = []
+        self._sequence = count()
+        self._pending = 0
+        self._error = None
+        self._closed = False
+
+        self._timer_thread = Thread(target=self._run_timers, daemon=True)
+        self._timer_thread.start()
+
+    def _run(self, fn, args):
+        try:
+            fn(*args)
+        except BaseException as error:
+            with self._condition:
+                self._error = self._error or error
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._running -= 1
+                self._start_ready()
+                self._condition.notify_all()
+
+    def _start_ready(self):
+        while self._ready and self._running < self._limit:
+            self._running += 1
+            self._pool.apply_async(self._run, self._ready.popleft())
+
+    def _dispatch(self, fn, args):
+        with self._condition:
+            self._ready.append((fn, args,))
+            self._start_ready()
+
+    def set_limit(self, limit):
+        '''Change the number of tasks run at the same time.'''
+        with self._condition:
+            self._limit = max(1, min(limit, self._workers))
+            self._start_ready()
+
+    def submit(self, fn, *args, delay=None):
+        '''Run `fn(*args)` in a worker after `delay` seconds.'''
+        with self._condition:
+            self._pending += 1
+            if delay:
+                heappush(self._timers, (
+                    monotonic() + delay, next(self._sequence), fn, args,))
+                self._condition.notify_all()
+                return
+
+        self._dispatch(fn, args)
+
+    def wake_all(self):
+        '''Run all delayed tasks without waiting for their delay.'''
+        with self._condition:
+            timers, self._timers = self._timers, []
+
+        for _, _, fn, args in sorted(timers):
+            self._dispatch(fn, args)
+
+    def _run_timers(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = monotonic()
+                    if self._timers and self._timers[0][0] <= now:
+                        break
+
+                    timeout = None
+                    if self._timers:
+                        timeout = self._timers[0][0] - now
+                    self._condition.wait(timeout)
+
+                if self._closed:
+                    return
+
+                _, _, fn, args = heappop(self._timers)
+
+            self._dispatch(fn, args)
+
+    def join(self):
+        '''Wait until all tasks have finished. Raises the first exception
+        raised by a task.'''
+        with self._condition:
+            while self._pending and not self._error:
+                self._condition.wait()
+
+            if self._error:
+                raise self._error
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._pool.close()
+        self._timer_thread.join()
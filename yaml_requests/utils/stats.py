@@ -0,0 +1,110 @@
+import json
+from math import inf
+import os
+from os import path
+from threading import Lock
+
+
+PASSED = 'passed'
+FAILED = 'failed'
+
+
+def plan_key(plan):
+    '''Return key used to identify the plan between runs.'''
+    key = path.realpath(plan.path) if plan.path else plan.name
+    if plan.matrix_row is not None:
+        return f'{key}[{plan.matrix_row}]'
+
+    return key
+
+
+class PlanStats:
+    '''Per-plan statistics persisted between runs in a JSON file.
+
+    In addition to durations, the file records the outcome of each plan and
+    whether the run was completed, so failed plans can be re-run and
+    interrupted runs can be resumed.
+    '''
+
+    def __init__(self, filename=None):
+        self._filename = filename
+        self._lock = Lock()
+        self._run, self._complete, self._data = self._load()
+
+    def _load(self):
+        if not self._filename:
+            return 0, True, {}
+
+        try:
+            with open(self._filename, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0, True, {}
+
+        if not isinstance(data, dict):
+            return 0, True, {}
+
+        if not isinstance(data.get('plans'), dict):
+            # Files written by earlier versions contain only the plans.
+            return 0, True, data
+
+        return data.get('run', 0), data.get('complete', True), data['plans']
+
+    def duration(self, plan):
+        '''Return the duration of the previous execution of the plan or
+        `None`, if the plan has not been executed before.'''
+        return self._data.get(plan_key(plan), {}).get('duration')
+
+    def outcome(self, plan):
+        '''Return the outcome of the previous execution of the plan, `PASSED`
+        or `FAILED`, or `None`, if the plan has not been executed before.'''
+        return self._data.get(plan_key(plan), {}).get('outcome')
+
+    def completed(self, plan):
+        '''Return `True`, if the plan was completed in the current run.'''
+        entry = self._data.get(plan_key(plan), {})
+        return entry.get('run') == self._run and 'outcome' in entry
+
+    def record(self, plan, duration, outcome=None):
+        with self._lock:
+            entry = self._data.setdefault(plan_key(plan), {})
+            entry['duration'] = duration
+            if outcome:
+                entry['outcome'] = outcome
+                entry['run'] = self._run
+
+    def longest_first(self, plans):
+        '''Sort plans by their previous duration in descending order. Plans
+        without recorded duration are executed first as their duration is
+        unknown.'''
+        def _duration(plan):
+            duration = self.duration(plan)
+            return inf if duration is None else duration
+
+        return sorted(plans, key=_duration, reverse=True)
+
+    def start(self, resume=False):
+        '''Start a new run. If `resume` is set and the previous run was not
+        completed, the previous run is continued instead.'''
+        if not resume or self._complete:
+            self._run += 1
+        self._complete = False
+        self.save()
+
+    def finish(self, complete=True):
+        self._complete = complete
+        self.save()
+
+    def save(self):
+        if not self._filename:
+            return
+
+        data = dict(run=self._run, complete=self._complete, plans=self._data)
+
+        # Replace the file atomically, so an interrupted run does not leave
+        # a partially written file.
+        tmp = f'{self._filename}.{os.getpid()}.tmp'
+        with self._lock:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self._filename)
@@ -1,10 +1,21 @@
+from hashlib import sha256
+import io
+from importlib.util import MAGIC_NUMBER
 import json
+import marshal
+import mmap
+import os
 from os import getenv, path
 from pathlib import Path
+from threading import Lock
+from types import CodeType
 
-from jinja2.exceptions import TemplateError
+from jinja2 import nodes
+from jinja2.environment import TemplateExpression
+from jinja2.exceptions import TemplateError, TemplateSyntaxError
 from jinja2.nativetypes import NativeEnvironment as _J2_NativeEnvironment
-from jinja2 import StrictUndefined
+from jinja2.parser import Parser
+from jinja2 import StrictUndefined, __version__ as _jinja2_version
 
 
 class TemplateDependencyError(TemplateError):
@@ -12,6 +23,189 @@ class TemplateDependencyError(TemplateError):
         super().__init__(message)
 
 
+class MappedFile(io.RawIOBase):
+    '''Read-only file object backed by a shared memory map. Reading from the
+    file does not load the whole file into memory.'''
+
+    def __init__(self, name, data):
+        super().__init__()
+        self.name = name
+        self._data = data
+        self._position = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._data)
+
+        self._position = max(offset, 0)
+        return self._position
+
+    def read(self, size=-1):
+        end = len(self._data)
+        if size is not None and size >= 0:
+            end = min(self._position + size, end)
+
+        data = self._data[self._position:end]
+        self._position = max(self._position, end)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class FileCache:
+    '''Thread-safe cache for files used by templates. Files are identified by
+    their resolved path and cached content is invalidated when the
+    modification time or size of the file changes.'''
+
+    def __init__(self):
+        self._text = {}
+        self._maps = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _stamp(filename):
+        stat = os.stat(filename)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _get(self, cache, filename, load, discard=None):
+        key = path.realpath(filename)
+        stamp = self._stamp(key)
+
+        with self._lock:
+            cached = cache.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        # Load outside of the lock to allow loading different files in
+        # parallel. If another thread loaded the same file in the meantime,
+        # its value is used.
+        value = load(key)
+        with self._lock:
+            cached = cache.get(key)
+            if not cached or cached[0] != stamp:
+                cache[key] = (stamp, value)
+                return value
+
+        if discard:
+            discard(value)
+        return cached[1]
+
+    def read_text(self, filename):
+        def _load(key):
+            with open(key, 'r') as f:
+                return f.read()
+
+        return self._get(self._text, filename, _load)
+
+    def open_mapped(self, filename):
+        '''Open file as `MappedFile`. Files that can not be memory mapped,
+        e.g. empty files and pipes, are opened as regular binary files.'''
+        def _load(key):
+            with open(key, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Opening a pipe twice would lose the data written to it.
+        if not path.isfile(filename):
+            return open(filename, 'rb')
+
+        try:
+            data = self._get(
+                self._maps, filename, _load, lambda data: data.close())
+        except (ValueError, OSError,):
+            return open(filename, 'rb')
+
+        return MappedFile(filename, data)
+
+    def close(self):
+        with self._lock:
+            for _, data in self._maps.values():
+                data.close()
+            self._maps = {}
+            self._text = {}
+
+
+class TemplateCache:
+    '''Thread-safe cache for compiled template code. The code does not depend
+    on the globals of the environment, so the cache can be shared between
+    environments that have the same configuration.
+
+    If `cache_dir` is defined, the compiled code is also stored on disk, so
+    it can be reused by later runs. Cached code is identified by the source
+    of the template and the versions of Jinja and Python.
+    '''
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = cache_dir
+        self._code = {}
+        self._lock = Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        data = json.dumps([_jinja2_version, MAGIC_NUMBER.hex(), *key])
+        digest = sha256(data.encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, f'{digest}.bin')
+
+    def _load(self, filename):
+        try:
+            with open(filename, 'rb') as f:
+                code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        return code if isinstance(code, CodeType) else None
+
+    def _save(self, filename, code):
+        tmp = f'{filename}.{os.getpid()}.{id(code)}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                marshal.dump(code, f)
+            os.replace(tmp, filename)
+        except OSError:
+            pass
+
+    def _compile(self, key, compile):
+        if not self._cache_dir:
+            return compile()
+
+        filename = self._path(key)
+        code = self._load(filename)
+        if code is None:
+            code = compile()
+            self._save(filename, code)
+
+        return code
+
+    def get(self, key, compile):
+        code = self._code.get(key)
+        if code is None:
+            # Compile outside of the lock to allow compiling different
+            # templates in parallel.
+            code = self._compile(key, compile)
+            with self._lock:
+                code = self._code.setdefault(key, code)
+
+        return code
+
+
 def to_json_filter(value):
     str(value)  # Raises UndefinedError if value is StrictUndefined
     return json.dumps(value)
@@ -20,6 +214,11 @@ def to_json_filter(value):
 class Environment(_J2_NativeEnvironment):
     def __init__(self, *args, **kwargs):
         self.path = kwargs.pop('path', None)
+        self._file_cache = kwargs.pop('file_cache', None) or FileCache()
+        self._template_cache = (
+            kwargs.pop('template_cache', None) or TemplateCache())
+        self._templates = {}
+        self._expressions = {}
         kwargs = {
             'undefined': StrictUndefined,
             **kwargs,
@@ -27,14 +226,82 @@ class Environment(_J2_NativeEnvironment):
 
         super().__init__(*args, **kwargs)
 
+        self._register_functions()
+        self.filters['to_json'] = to_json_filter
+
+    def _register_functions(self):
+        # Functions are bound to the environment, so that files are found
+        # relative to the path of the environment.
         self.globals['lookup'] = self.lookup
         self.globals['open'] = self.open
-        self.filters['to_json'] = to_json_filter
+
+    def plan_overlay(self, path=None):
+        '''Return environment for a plan. The overlay shares filters, compiled
+        templates and cached files with this environment, but has a copy of
+        the globals, so variables registered to the overlay are not visible
+        to other plans.'''
+        env = self.overlay()
+        env.path = path
+        env.globals = dict(self.globals)
+        env._templates = {}
+        env._expressions = {}
+        # Called through the class, because jinja2 types the overlay as a
+        # plain jinja2 environment.
+        Environment._register_functions(env)
+        return env
 
     def register(self, name, value):
         self.globals[name] = value
 
-    def open(self, src, mode='rb'):
+    def _from_code(self, key, compile):
+        code = self._template_cache.get(key, compile)
+        return self.template_class.from_code(
+            self, code, self.make_globals(None))
+
+    def from_string(self, source, globals=None, template_class=None):
+        if not isinstance(source, str) or globals or template_class:
+            return super().from_string(source, globals, template_class)
+
+        # Templates refer to the globals of this environment, so they can be
+        # reused while the values of the globals change.
+        template = self._templates.get(source)
+        if template is None:
+            template = self._from_code(
+                ('template', source), lambda: self.compile(source))
+            self._templates[source] = template
+
+        return template
+
+    def _compile_expression(self, source):
+        # Same as jinja2.Environment.compile_expression, but returns the
+        # compiled code instead of the template.
+        parser = Parser(self, source, state='variable')
+        try:
+            expr = parser.parse_expression()
+            if not parser.stream.eos:
+                raise TemplateSyntaxError(
+                    'chunk after expression',
+                    parser.stream.current.lineno,
+                    None,
+                    None)
+            expr.set_environment(self)
+        except TemplateSyntaxError:
+            self.handle_exception(source=source)
+
+        body = [nodes.Assign(nodes.Name('result', 'store'), expr, lineno=1)]
+        return self.compile(nodes.Template(body, lineno=1))
+
+    def compile_expression(self, source, undefined_to_none=True):
+        template = self._expressions.get(source)
+        if template is None:
+            template = self._from_code(
+                ('expression', source),
+                lambda: self._compile_expression(source))
+            self._expressions[source] = template
+
+        return TemplateExpression(template, undefined_to_none)
+
+    def _find_file(self, src, read):
         paths = [src]
         if self.path:
             paths.append(
@@ -42,18 +309,21 @@ class Environment(_J2_NativeEnvironment):
 
         for i in paths:
             try:
-                return open(i, mode)
+                return read(i)
             except FileNotFoundError:
                 pass
 
         raise TemplateDependencyError(
             f'File {src} not found from {" or ".join(paths)}')
 
+    def open(self, src, mode='rb'):
+        if mode == 'rb':
+            return self._find_file(src, self._file_cache.open_mapped)
+
+        return self._find_file(src, lambda i: open(i, mode))
+
     def _lookup_file(self, src):
-        f = self.open(src, "r")
-        content = f.read()
-        f.close()
-        return content
+        return self._find_file(src, self._file_cache.read_text)
 
     def lookup(self, value, src):
         if value == 'env':